@@ -0,0 +1,168 @@
+"""Load test for the translation service.
+
+Sends requests to a running backend at a fixed concurrency and reports
+latency percentiles, throughput and error rate. Pair it with
+mock_openai.py to measure the service itself with no network:
+
+    python benchmark.py --endpoint single --concurrency 20 --requests 500
+    python benchmark.py --endpoint batch --languages French,German,Spanish --json
+
+Exits with status 1 when a --max-* threshold is exceeded, so it can gate CI.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import httpx
+
+DEFAULT_TEXT = (
+    "<h1>Quarterly update</h1>"
+    "<p>Our team shipped three new features this quarter and reduced support response times.</p>"
+    "<p>Thank you to everyone who sent feedback; it shaped the roadmap for the next release.</p>"
+)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return None
+    rank = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def request_body(args, index):
+    text = args.text
+    if args.unique:
+        # A distinct paragraph per request defeats the translation memory
+        text += f"<p>Request {index}</p>"
+    if args.endpoint == "batch":
+        return {"text": text, "languages": args.languages}
+    return {"text": text}
+
+
+def request_url(args):
+    if args.endpoint == "batch":
+        return f"{args.url}/translate/batch"
+    if args.endpoint == "stream":
+        return f"{args.url}/translate/{args.languages[0]}/stream"
+    return f"{args.url}/translate/{args.languages[0]}/"
+
+
+async def send(client, args, url, index):
+    """Issue one request; returns ``(seconds, error)`` with ``error`` ``None`` on success."""
+    started = time.monotonic()
+    try:
+        if args.endpoint == "stream":
+            async with client.stream("POST", url, json=request_body(args, index)) as response:
+                response.raise_for_status()
+                error = None
+                async for line in response.aiter_lines():
+                    if line == "event: error":
+                        error = "error event"
+        else:
+            response = await client.post(url, json=request_body(args, index))
+            response.raise_for_status()
+            errors = response.json().get("errors") if args.endpoint == "batch" else None
+            error = f"{len(errors)} languages failed" if errors else None
+    except httpx.HTTPStatusError as e:
+        error = f"HTTP {e.response.status_code}"
+    except httpx.HTTPError as e:
+        error = type(e).__name__
+    return time.monotonic() - started, error
+
+
+async def run(args):
+    url = request_url(args)
+    latencies = []
+    errors = {}
+    next_index = iter(range(args.requests))
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+        async def worker():
+            for index in next_index:
+                seconds, error = await send(client, args, url, index)
+                if error is None:
+                    latencies.append(seconds)
+                else:
+                    errors[error] = errors.get(error, 0) + 1
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+    failed = sum(errors.values())
+    return {
+        "endpoint": args.endpoint,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "succeeded": len(latencies),
+        "failed": failed,
+        "error_rate": failed / args.requests if args.requests else 0,
+        "errors": errors,
+        "seconds": elapsed,
+        "throughput": args.requests / elapsed if elapsed else 0,
+        "mean": sum(latencies) / len(latencies) if latencies else None,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "max": latencies[-1] if latencies else None,
+    }
+
+
+def print_report(report):
+    def seconds(value):
+        return "-" if value is None else f"{value * 1000:.0f} ms"
+
+    print(f"{report['endpoint']}: {report['requests']} requests at concurrency {report['concurrency']} "
+          f"in {report['seconds']:.1f}s")
+    print(f"  throughput  {report['throughput']:.1f} req/s")
+    print(f"  error rate  {report['error_rate']:.2%} ({report['failed']} failed)")
+    for error, count in sorted(report["errors"].items(), key=lambda item: -item[1]):
+        print(f"    {count:>6}  {error}")
+    print(f"  latency     p50 {seconds(report['p50'])}  p95 {seconds(report['p95'])}  "
+          f"p99 {seconds(report['p99'])}  max {seconds(report['max'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000", help="backend base URL")
+    parser.add_argument("--endpoint", choices=["single", "batch", "stream"], default="single")
+    parser.add_argument("--languages", default="French", help="comma-separated; single and stream use the first")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--text-file", help="HTML document to translate instead of the built-in sample")
+    parser.add_argument("--unique", action="store_true", help="make every request miss the translation memory")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--max-p95", type=float, help="fail if p95 latency exceeds this many seconds")
+    parser.add_argument("--max-error-rate", type=float, help="fail if the error rate exceeds this fraction")
+    args = parser.parse_args()
+    args.languages = [language.strip() for language in args.languages.split(",") if language.strip()]
+    if args.text_file:
+        with open(args.text_file, encoding="utf-8") as f:
+            args.text = f.read()
+    else:
+        args.text = DEFAULT_TEXT
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    failures = []
+    if args.max_p95 is not None and (report["p95"] is None or report["p95"] > args.max_p95):
+        failures.append(f"p95 above {args.max_p95}s")
+    if args.max_error_rate is not None and report["error_rate"] > args.max_error_rate:
+        failures.append(f"error rate above {args.max_error_rate:.2%}")
+    if failures:
+        print(f"Benchmark thresholds exceeded: {', '.join(failures)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """Normalize source text so trivially different inputs share a cache entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(text, language, model, prompt_version):
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{digest}:{language}:{model}:{prompt_version}"
+
+
+class LRUCache:
+    """In-process LRU with a size bound and optional time-to-live."""
+
+    def __init__(self, max_entries, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if self.ttl and time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, stored_at=None):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, stored_at or time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TranslationCache:
+    """Translation memory with an LRU tier in front of a SQLite tier.
+
+    Entries are keyed by the hash of the normalized source text, the target
+    language, the model and the prompt template version, so changing any of
+    them naturally misses instead of returning stale output.
+    """
+
+    def __init__(self, path, max_entries=10000, ttl=None):
+        self.memory = LRUCache(max_entries, ttl)
+        self.ttl = ttl
+        self.stats_counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+        self._lock = threading.Lock()
+        # The SQLite tier may be shared by several worker processes
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS translation_memory ("
+            "key TEXT PRIMARY KEY, "
+            "translation TEXT NOT NULL, "
+            "created_at REAL NOT NULL)"
+        )
+
+    def get(self, text, language, model, prompt_version):
+        key = cache_key(text, language, model, prompt_version)
+        value = self.memory.get(key)
+        if value is not None:
+            self.stats_counters["memory_hits"] += 1
+            return value
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT translation, created_at FROM translation_memory WHERE key = ?", (key,)
+            ).fetchone()
+        if row is not None and (not self.ttl or time.time() - row[1] <= self.ttl):
+            self.stats_counters["disk_hits"] += 1
+            self.memory.set(key, row[0], row[1])
+            return row[0]
+
+        self.stats_counters["misses"] += 1
+        return None
+
+    def set(self, text, language, model, prompt_version, translation):
+        key = cache_key(text, language, model, prompt_version)
+        now = time.time()
+        self.memory.set(key, translation, now)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO translation_memory (key, translation, created_at) VALUES (?, ?, ?)",
+                (key, translation, now),
+            )
+        self.stats_counters["writes"] += 1
+
+    def set_many(self, entries):
+        """Store ``(text, language, model, prompt_version, translation)`` entries in one transaction.
+
+        Meant for bulk loads: entries go to the SQLite tier only, so they do
+        not push the working set out of the LRU tier.
+        """
+        now = time.time()
+        rows = [(cache_key(*entry[:4]), entry[4], now) for entry in entries]
+        if not rows:
+            return
+        for key, _, _ in rows:
+            self.memory.discard(key)
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO translation_memory (key, translation, created_at) VALUES (?, ?, ?)", rows
+                )
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        self.stats_counters["writes"] += len(rows)
+
+    def stats(self):
+        lookups = self.stats_counters["memory_hits"] + self.stats_counters["disk_hits"] + self.stats_counters["misses"]
+        hits = lookups - self.stats_counters["misses"]
+        return {
+            **self.stats_counters,
+            "memory_entries": len(self.memory),
+            "hit_ratio": hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
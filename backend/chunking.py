@@ -0,0 +1,105 @@
+import re
+
+from segments import TAG_RE, TAG_NAME_RE, is_translatable
+
+# Split points tried in order, coarsest first: paragraphs, lines, sentences, words
+SEPARATORS = [
+    re.compile(r"\n\s*\n"),
+    re.compile(r"\n"),
+    re.compile(r"(?<=[.!?;:。！？])\s+"),
+    re.compile(r"\s+"),
+]
+
+VOID_TAGS = {"br", "hr", "img", "input", "meta", "link", "wbr"}
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (about four characters per token for English)."""
+    return len(text) // 4 + 1
+
+
+def safe_offsets(text):
+    """Offsets where the text can be cut without splitting a tag or an inline element."""
+    safe = set()
+    depth = 0
+    position = 0
+    for match in TAG_RE.finditer(text):
+        if depth == 0:
+            safe.update(range(position, match.start() + 1))
+        tag = match.group(0)
+        name = TAG_NAME_RE.match(tag)
+        if name and name.group(1).lower() not in VOID_TAGS and not tag.endswith("/>"):
+            depth = max(depth - 1, 0) if tag.startswith("</") else depth + 1
+        position = match.end()
+    if depth == 0:
+        safe.update(range(position, len(text) + 1))
+    return safe
+
+
+def split_on(text, separator, safe, offset=0):
+    """Split after each separator match that falls on a safe offset.
+
+    ``offset`` is the position of ``text`` within the string ``safe`` refers to.
+    """
+    pieces = []
+    start = 0
+    for match in separator.finditer(text):
+        if offset + match.start() in safe and offset + match.end() in safe and match.end() < len(text):
+            pieces.append(text[start:match.end()])
+            start = match.end()
+    pieces.append(text[start:])
+    return pieces
+
+
+def split_into_chunks(text, max_tokens):
+    """Split text into consecutive chunks of at most ``max_tokens`` estimated tokens.
+
+    Chunks concatenate back to the original text. Cuts prefer paragraph, then
+    line, then sentence, then word boundaries, and never land inside a tag or
+    an open inline element; a piece with no usable boundary is kept whole.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    safe = safe_offsets(text)
+
+    def split(piece, offset, level):
+        if estimate_tokens(piece) <= max_tokens or level == len(SEPARATORS):
+            return [piece]
+        result = []
+        for part in split_on(piece, SEPARATORS[level], safe, offset):
+            result.extend(split(part, offset, level + 1))
+            offset += len(part)
+        return result
+
+    chunks = []
+    for piece in split(text, 0, 0):
+        if chunks and estimate_tokens(chunks[-1] + piece) <= max_tokens:
+            chunks[-1] += piece
+        else:
+            chunks.append(piece)
+    return chunks
+
+
+def chunk_parts(parts, max_tokens):
+    """Replace oversized translatable fragments from ``split_segments`` with their chunks."""
+    chunked = []
+    for fragment, translatable in parts:
+        if not translatable:
+            chunked.append((fragment, False))
+            continue
+        for chunk in split_into_chunks(fragment, max_tokens):
+            # Like split_segments, a chunk without words (such as a separator
+            # that fit in no chunk) is kept as it is, and whitespace around
+            # the others stays outside the segment
+            if not is_translatable(chunk):
+                chunked.append((chunk, False))
+                continue
+            stripped = chunk.strip()
+            start = chunk.index(stripped)
+            if start:
+                chunked.append((chunk[:start], False))
+            chunked.append((stripped, True))
+            if start + len(stripped) < len(chunk):
+                chunked.append((chunk[start + len(stripped):], False))
+    return chunked
@@ -0,0 +1,71 @@
+import asyncio
+
+
+class LeaderCancelled(Exception):
+    """The call a request was waiting on was cancelled before it finished."""
+
+
+class SingleFlight:
+    """Share one upstream call between concurrent requests for the same key.
+
+    The first caller for a key leads: it registers a future with ``lead``
+    and settles it with ``finish``. Callers arriving meanwhile ``join`` and
+    await that future instead of issuing their own call.
+    """
+
+    def __init__(self):
+        self._futures = {}
+        self.stats_counters = {"calls": 0, "coalesced": 0}
+
+    def join(self, key):
+        """Future of the call in flight for ``key``, or ``None``."""
+        future = self._futures.get(key)
+        if future is not None:
+            self.stats_counters["coalesced"] += 1
+        return future
+
+    def lead(self, key):
+        future = asyncio.get_running_loop().create_future()
+        self._futures[key] = future
+        self.stats_counters["calls"] += 1
+        return future
+
+    def finish(self, key, result=None, error=None):
+        future = self._futures.pop(key, None)
+        if future is None or future.done():
+            return
+        if error is None:
+            future.set_result(result)
+            return
+        future.set_exception(error)
+        # Followers may all be gone; don't warn about an unretrieved exception
+        future.exception()
+
+    async def wait(self, future):
+        return await asyncio.shield(future)
+
+    async def do(self, key, factory):
+        """Run ``factory()`` for ``key`` unless an identical call is already in flight."""
+        while True:
+            future = self.join(key)
+            if future is None:
+                break
+            try:
+                return await self.wait(future)
+            except LeaderCancelled:
+                continue
+
+        self.lead(key)
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            self.finish(key, error=LeaderCancelled())
+            raise
+        except Exception as e:
+            self.finish(key, error=e)
+            raise
+        self.finish(key, result)
+        return result
+
+    def stats(self):
+        return {**self.stats_counters, "in_flight": len(self._futures)}
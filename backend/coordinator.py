@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class Coordinator:
+    """State shared by the worker processes of one host through a SQLite file.
+
+    Holds the rate-limit buckets and pauses, so all workers together stay
+    within the deployment quota, and claims on translations in flight, so
+    only one worker calls the model for a given segment. Every operation
+    is a short transaction; times are wall-clock so they compare across
+    processes.
+
+    Writes may wait up to 30 s for another process's lock, so async
+    callers run them in a thread. Each thread has its own connection, and
+    in WAL mode reads never wait for a writer.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS buckets (
+                name TEXT PRIMARY KEY,
+                level REAL NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS pauses (
+                name TEXT PRIMARY KEY,
+                until REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS flights (
+                key TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires REAL NOT NULL
+            );
+            """
+        )
+
+    @property
+    def _db(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def _level(self, name, rate, capacity, now):
+        row = self._db.execute("SELECT level, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return capacity
+        return min(capacity, row[0] + (now - row[1]) * rate)
+
+    def _wait(self, pause, buckets, now):
+        row = self._db.execute("SELECT until FROM pauses WHERE name = ?", (pause,)).fetchone()
+        wait = row[0] - now if row else 0
+        levels = {}
+        for name, rate, capacity, amount in buckets:
+            levels[name] = self._level(name, rate, capacity, now)
+            wait = max(wait, (min(amount, capacity) - levels[name]) / rate)
+        return max(wait, 0), levels
+
+    def _write(self, statement):
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            result = statement()
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+        return result
+
+    def delay(self, pause, buckets):
+        """Seconds until every bucket can cover its amount; ``buckets`` are (name, rate, capacity, amount)."""
+        return self._wait(pause, buckets, time.time())[0]
+
+    def take(self, pause, buckets):
+        """Take from every bucket at once if all can cover it; returns 0, or the seconds to wait otherwise."""
+        def statement():
+            now = time.time()
+            wait, levels = self._wait(pause, buckets, now)
+            if wait <= 0:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO buckets (name, level, updated) VALUES (?, ?, ?)",
+                    [(name, levels[name] - amount, now) for name, rate, capacity, amount in buckets],
+                )
+            return wait
+        return self._write(statement)
+
+    def adjust(self, name, rate, capacity, amount):
+        """Take ``amount`` more from a bucket, or give it back when negative."""
+        def statement():
+            now = time.time()
+            level = self._level(name, rate, capacity, now)
+            self._db.execute(
+                "INSERT OR REPLACE INTO buckets (name, level, updated) VALUES (?, ?, ?)",
+                (name, min(level - amount, capacity), now),
+            )
+        self._write(statement)
+
+    def levels(self, buckets):
+        """Fill level of each bucket; ``buckets`` are (name, rate, capacity)."""
+        now = time.time()
+        return [self._level(name, rate, capacity, now) for name, rate, capacity in buckets]
+
+    def pause(self, name, seconds):
+        def statement():
+            until = time.time() + seconds
+            self._db.execute(
+                "INSERT INTO pauses (name, until) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET until = MAX(until, excluded.until)",
+                (name, until),
+            )
+        self._write(statement)
+
+    def paused(self, name):
+        row = self._db.execute("SELECT until FROM pauses WHERE name = ?", (name,)).fetchone()
+        return row is not None and row[0] > time.time()
+
+    def claim(self, key, ttl):
+        """Claim ``key`` for this process unless another live claim holds it."""
+        def statement():
+            now = time.time()
+            self._db.execute("DELETE FROM flights WHERE key = ? AND expires <= ?", (key, now))
+            self._db.execute(
+                "INSERT OR IGNORE INTO flights (key, owner, expires) VALUES (?, ?, ?)", (key, self.owner, now + ttl)
+            )
+            row = self._db.execute("SELECT owner FROM flights WHERE key = ?", (key,)).fetchone()
+            return row[0] == self.owner
+        return self._write(statement)
+
+    def claimed(self, key):
+        row = self._db.execute(
+            "SELECT 1 FROM flights WHERE key = ? AND expires > ?", (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def release(self, key):
+        self._db.execute("DELETE FROM flights WHERE key = ? AND owner = ?", (key, self.owner))
+
+    def ping(self):
+        self._db.execute("SELECT 1").fetchone()
+
+    def close(self):
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+
+
+class SharedRateLimiter:
+    """RateLimiter whose buckets and Retry-After pauses live in a Coordinator.
+
+    Same interface and refill rules as ``ratelimit.RateLimiter``, but every
+    worker process draws from the same quota.
+    """
+
+    def __init__(self, coordinator, name, requests_per_minute=None, tokens_per_minute=None, burst_seconds=10):
+        self.coordinator = coordinator
+        self.pause_name = name
+        self.requests = self.bucket(f"{name}:requests", requests_per_minute, burst_seconds)
+        self.tokens = self.bucket(f"{name}:tokens", tokens_per_minute, burst_seconds)
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def bucket(name, per_minute, burst_seconds):
+        if not per_minute:
+            return None
+        rate = per_minute / 60
+        return name, rate, max(rate * burst_seconds, 1)
+
+    def demands(self, tokens):
+        demands = []
+        if self.requests:
+            demands.append((*self.requests, 1))
+        if self.tokens:
+            demands.append((*self.tokens, tokens))
+        return demands
+
+    def delay(self, tokens):
+        return self.coordinator.delay(self.pause_name, self.demands(tokens))
+
+    async def acquire(self, tokens):
+        # One waiter per process at a time; the coordinator orders processes
+        async with self._lock:
+            while (wait := await asyncio.to_thread(self.coordinator.take, self.pause_name, self.demands(tokens))) > 0:
+                await asyncio.sleep(wait)
+
+    def settle(self, estimated_tokens, actual_tokens):
+        if self.tokens and actual_tokens is not None:
+            self.in_background(self.coordinator.adjust, *self.tokens, actual_tokens - estimated_tokens)
+
+    def pause(self, seconds):
+        self.in_background(self.coordinator.pause, self.pause_name, seconds)
+
+    @staticmethod
+    def in_background(write, *args):
+        """Run a coordinator write in a thread without waiting for it, as the RateLimiter interface is synchronous."""
+        def report(future):
+            if not future.cancelled() and future.exception() is not None:
+                logger.warning(f"Shared rate limiter update failed: {str(future.exception())}")
+        asyncio.get_running_loop().run_in_executor(None, write, *args).add_done_callback(report)
+
+    def remaining(self):
+        buckets = [bucket for bucket in (self.requests, self.tokens) if bucket]
+        if not buckets:
+            return 1.0
+        if self.coordinator.paused(self.pause_name):
+            return 0.0
+        levels = self.coordinator.levels(buckets)
+        return min(max(level, 0) / capacity for level, (_, _, capacity) in zip(levels, buckets))
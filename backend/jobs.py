@@ -0,0 +1,177 @@
+import sqlite3
+import threading
+import time
+import uuid
+
+
+class JobQueue:
+    """Persistent queue of translation work items backed by SQLite.
+
+    A job is many texts times many languages; each (text, language) pair is
+    one item, so progress is checkpointed per language and a restart only
+    redoes the items that were in flight.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        # Worker processes sharing the queue wait for each other's writes
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                pack_size INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS job_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL REFERENCES jobs (id),
+                project TEXT NOT NULL,
+                language TEXT NOT NULL,
+                text TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL DEFAULT 0,
+                translation TEXT,
+                error TEXT,
+                saved INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS job_items_status ON job_items (status, available_at);
+            CREATE INDEX IF NOT EXISTS job_items_job ON job_items (job_id, status);
+            """
+        )
+
+    def submit(self, items, languages, pack_size=1):
+        """Queue every (project text, language) pair and return the new job id."""
+        job_id = uuid.uuid4().hex
+        rows = [
+            (job_id, item["project"], language, item["text"])
+            for item in items
+            for language in languages
+        ]
+        with self._lock:
+            with self._db:
+                self._db.execute("BEGIN")
+                self._db.execute(
+                    "INSERT INTO jobs (id, pack_size, created_at) VALUES (?, ?, ?)",
+                    (job_id, pack_size, time.time()),
+                )
+                self._db.executemany(
+                    "INSERT INTO job_items (job_id, project, language, text) VALUES (?, ?, ?, ?)", rows
+                )
+        return job_id
+
+    def recover(self):
+        """Return running items whose lease ran out, e.g. after their process died, to the queue."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE job_items SET status = 'pending' WHERE status = 'running' AND available_at <= ?",
+                (time.time(),),
+            )
+
+    def claim(self, lease=600):
+        """Claim the next batch of pending items sharing one job and project.
+
+        Claimed items are leased for ``lease`` seconds; several processes
+        can share the queue. Returns ``(job_id, project, text, pack_size,
+        items)`` where items maps item id to language, or ``None`` when
+        nothing is ready.
+        """
+        with self._lock:
+            with self._db:
+                self._db.execute("BEGIN IMMEDIATE")
+                first = self._db.execute(
+                    "SELECT job_items.job_id, project, text, pack_size FROM job_items "
+                    "JOIN jobs ON jobs.id = job_items.job_id "
+                    "WHERE status = 'pending' AND available_at <= ? ORDER BY job_items.id LIMIT 1",
+                    (time.time(),),
+                ).fetchone()
+                if first is None:
+                    return None
+                rows = self._db.execute(
+                    "SELECT id, language FROM job_items "
+                    "WHERE job_id = ? AND project = ? AND text = ? AND status = 'pending' AND available_at <= ? "
+                    "ORDER BY id LIMIT ?",
+                    (first["job_id"], first["project"], first["text"], time.time(), max(first["pack_size"], 1)),
+                ).fetchall()
+                self._db.executemany(
+                    "UPDATE job_items SET status = 'running', attempts = attempts + 1, available_at = ? WHERE id = ?",
+                    [(time.time() + lease, row["id"]) for row in rows],
+                )
+        items = {row["id"]: row["language"] for row in rows}
+        return first["job_id"], first["project"], first["text"], first["pack_size"], items
+
+    def complete(self, item_id, translation):
+        with self._lock:
+            self._db.execute(
+                "UPDATE job_items SET status = 'done', translation = ?, error = NULL WHERE id = ?",
+                (translation, item_id),
+            )
+
+    def fail(self, item_id, error, max_attempts, retry_delay):
+        """Record a failure, requeueing the item until it has used ``max_attempts``."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE job_items SET error = ?, "
+                "status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END, "
+                "available_at = ? WHERE id = ?",
+                (error, max_attempts, time.time() + retry_delay, item_id),
+            )
+
+    def unsaved_results(self, limit=500):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, project, language, text, translation FROM job_items "
+                "WHERE status = 'done' AND saved = 0 ORDER BY id LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def mark_saved(self, item_ids):
+        with self._lock:
+            with self._db:
+                self._db.execute("BEGIN")
+                self._db.executemany("UPDATE job_items SET saved = 1 WHERE id = ?", [(item_id,) for item_id in item_ids])
+
+    def progress(self, job_id):
+        """Item counts by status for a job, or ``None`` if the job does not exist."""
+        with self._lock:
+            job = self._db.execute("SELECT id, created_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            counts = dict(
+                self._db.execute(
+                    "SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status", (job_id,)
+                ).fetchall()
+            )
+            unsaved = self._db.execute(
+                "SELECT COUNT(*) FROM job_items WHERE job_id = ? AND status = 'done' AND saved = 0", (job_id,)
+            ).fetchone()[0]
+            errors = self._db.execute(
+                "SELECT project, language, error FROM job_items WHERE job_id = ? AND status = 'failed'", (job_id,)
+            ).fetchall()
+
+        total = sum(counts.values())
+        finished = counts.get("done", 0) + counts.get("failed", 0)
+        if finished < total or unsaved:
+            status = "running" if finished or counts.get("running") else "pending"
+        else:
+            status = "completed_with_errors" if counts.get("failed") else "completed"
+        return {
+            "job_id": job_id,
+            "status": status,
+            "created_at": job["created_at"],
+            "total": total,
+            "pending": counts.get("pending", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "errors": [dict(row) for row in errors],
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -1,11 +1,36 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+import asyncio
+import httpx
 import openai
 import os
+import sys
 import json
-import re
+import tempfile
+import time
 from dotenv import load_dotenv
 import logging
+from cache import TranslationCache, cache_key
+from coalesce import LeaderCancelled, SingleFlight
+from segments import align_segments, join_segments, split_segments, unique_segments
+from chunking import chunk_parts, estimate_tokens
+from jobs import JobQueue
+# The translations storage is shared with the Streamlit app
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+from storage import TranslationStore
+from ratelimit import AdaptiveConcurrency, RateLimiter, backoff_delay, retry_after_seconds
+from router import Deployment, Router
+from coordinator import Coordinator, SharedRateLimiter
+from scheduler import Lane, LaneScheduler, current_lane, parse_lane_settings
+from streaming import JsonStringExtractor, Replacement, sse_event
+from parsing import extract_translations, response_schema
+from prompts import PromptRegistry
+import transfer
+import metrics
+from metrics import record_span, request_spans, span, span_summary
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -14,6 +39,15 @@ logger = logging.getLogger(__name__)
 app = FastAPI()
 
 load_dotenv()
+
+# Full prompts, model replies and per-segment progress are only logged with
+# TRANSLATION_DEBUG=1; formatting them on every call is a hot-path cost
+debug_logging = os.getenv('TRANSLATION_DEBUG', '0').lower() in ('1', 'true', 'yes')
+if debug_logging:
+    logger.setLevel(logging.DEBUG)
+else:
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
 endpoint = os.getenv('AZURE_OPENAI_ENDPOINT')
 api_key = os.getenv('AZURE_OPENAI_API_KEY')
 api_version = os.getenv('AZURE_OPENAI_API_VERSION')
@@ -22,11 +56,158 @@ logger.info(f"Endpoint: {endpoint}")
 logger.info(f"API Key: {'****' if api_key else 'Not set'}")
 logger.info(f"API Version: {api_version}")
 
-client = openai.AzureOpenAI(
-    azure_endpoint=endpoint,
-    api_key=api_key,
-    api_version=api_version,
-)
+# Model and deployment name, unless AZURE_OPENAI_DEPLOYMENTS says otherwise
+model = os.getenv('AZURE_OPENAI_MODEL', 'gpt-4o')
+
+# Connection pool shared by every in-flight translation
+max_connections = int(os.getenv('OPENAI_MAX_CONNECTIONS', '100'))
+max_keepalive_connections = int(os.getenv('OPENAI_MAX_KEEPALIVE_CONNECTIONS', '20'))
+keepalive_expiry = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', '30'))
+request_timeout = float(os.getenv('OPENAI_TIMEOUT', '120'))
+
+# Translation memory in front of the model. Its SQLite tier is shared by
+# every worker process pointing at the same file.
+cache_path = os.getenv('TRANSLATION_CACHE_PATH', 'translation_cache.db')
+cache_size = int(os.getenv('TRANSLATION_CACHE_SIZE', '10000'))
+cache_ttl = float(os.getenv('TRANSLATION_CACHE_TTL', '0')) or None
+
+# Concurrent requests for the same (segment, language) share one upstream call
+single_flight = SingleFlight()
+
+# Offline batch jobs: a persistent queue drained by background workers that
+# write finished translations into the app's translations table. Claimed
+# items go back to the queue if not finished within the lease.
+jobs_path = os.getenv('TRANSLATION_JOBS_PATH', 'translation_jobs.db')
+translations_database_url = os.getenv('TRANSLATIONS_DATABASE_URL', 'sqlite:///translations.db')
+compress_min_bytes = int(os.getenv('TRANSLATIONS_COMPRESS_MIN_BYTES', '1024'))
+job_workers = int(os.getenv('TRANSLATION_JOB_WORKERS', '4'))
+job_max_attempts = int(os.getenv('TRANSLATION_JOB_MAX_ATTEMPTS', '3'))
+job_retry_delay = float(os.getenv('TRANSLATION_JOB_RETRY_DELAY', '30'))
+job_poll_interval = float(os.getenv('TRANSLATION_JOB_POLL_INTERVAL', '1'))
+job_lease = float(os.getenv('TRANSLATION_JOB_LEASE', '600'))
+
+# Bulk export and import of the translations table: rows fetched per cursor
+# round trip, rows written per transaction, and how much of an upload is
+# buffered in memory before spilling to a temporary file
+export_batch_size = int(os.getenv('TRANSLATION_EXPORT_BATCH_SIZE', '1000'))
+import_batch_size = int(os.getenv('TRANSLATION_IMPORT_BATCH_SIZE', '1000'))
+import_spool_bytes = int(os.getenv('TRANSLATION_IMPORT_SPOOL_BYTES', str(16 * 1024 * 1024)))
+source_language = os.getenv('TRANSLATION_SOURCE_LANGUAGE', 'en')
+
+# Multi-worker mode (uvicorn --workers, or WEB_CONCURRENCY): worker processes
+# share rate-limit budgets and in-flight translations through this SQLite
+# file. Unset, each process keeps that state to itself.
+coordinator_path = os.getenv('TRANSLATION_COORDINATOR_PATH')
+worker_processes = int(os.getenv('WEB_CONCURRENCY', '1'))
+# How long a worker's claim on an in-flight translation lasts, and how often others check on it
+flight_ttl = float(os.getenv('TRANSLATION_FLIGHT_TTL', '120'))
+flight_poll_interval = float(os.getenv('TRANSLATION_FLIGHT_POLL_INTERVAL', '0.1'))
+
+# Clients, SQLite connections and the router are created per worker process
+# at startup rather than at import, so a forking server never shares them
+http_client = None
+router = None
+translation_cache = None
+job_queue = None
+translation_store = None
+coordinator = None
+ready = False
+job_available = asyncio.Event()
+job_save_lock = asyncio.Lock()
+background_tasks = []
+
+def calls_model(request):
+    return request.url.path.startswith("/translate/") or (request.method == "POST" and request.url.path == "/jobs")
+
+@app.middleware("http")
+async def assign_lane(request: Request, call_next):
+    """Put the request in the lane named by its X-Translation-Lane header or lane query parameter.
+
+    Only requests for translations are checked; health, metrics and other
+    routes ignore the lane, so a stray parameter cannot fail them.
+    """
+    if not calls_model(request):
+        return await call_next(request)
+    lane = request.headers.get("x-translation-lane") or request.query_params.get("lane") or "interactive"
+    if lane not in scheduler.lanes:
+        return JSONResponse(
+            status_code=400,
+            content={"detail": f"Lane '{lane}' not found. Lanes are: {', '.join(scheduler.lanes)}"},
+        )
+    current_lane.set(lane)
+    return await call_next(request)
+
+@app.middleware("http")
+async def record_request_timing(request: Request, call_next):
+    """Observe end-to-end latency, including streamed bodies, and log the request's timing spans."""
+    if request.url.path in ("/metrics", "/healthz", "/readyz"):
+        return await call_next(request)
+    spans = {}
+    request_spans.set(spans)
+    started = time.monotonic()
+    response = await call_next(request)
+    body = response.body_iterator
+
+    async def timed_body():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            elapsed = time.monotonic() - started
+            route = request.scope.get("route")
+            path = route.path if route else "unmatched"
+            metrics.request_latency.labels(path, str(response.status_code)).observe(elapsed)
+            logger.info(json.dumps({
+                "event": "request_timing",
+                "method": request.method,
+                "route": path,
+                "status": response.status_code,
+                "seconds": round(elapsed, 4),
+                "spans": span_summary(spans),
+            }))
+
+    response.body_iterator = timed_body()
+    return response
+
+@app.on_event("startup")
+async def start_worker():
+    global http_client, router, translation_cache, job_queue, translation_store, coordinator, ready
+    if coordinator_path:
+        coordinator = Coordinator(coordinator_path)
+    elif worker_processes > 1:
+        logger.warning("Several workers without TRANSLATION_COORDINATOR_PATH: each one enforces the whole quota on its own")
+
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        timeout=request_timeout,
+    )
+    router = build_router()
+    translation_cache = TranslationCache(cache_path, max_entries=cache_size, ttl=cache_ttl)
+    job_queue = JobQueue(jobs_path)
+    translation_store = TranslationStore(translations_database_url, compress_min_bytes=compress_min_bytes)
+
+    job_queue.recover()
+    background_tasks.extend(asyncio.create_task(run_job_worker()) for _ in range(job_workers))
+    ready = True
+
+@app.on_event("shutdown")
+async def close_client():
+    global ready
+    ready = False
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    scheduler.close()
+    await http_client.aclose()
+    translation_cache.close()
+    job_queue.close()
+    translation_store.close()
+    if coordinator is not None:
+        coordinator.close()
 
 class TranslationRequest(BaseModel):
     text: str
@@ -39,49 +220,955 @@ supported_languages = [
     "Greek", "Hebrew", "Indonesian", "Malay", "Persian"
 ]
 
-@app.post("/translate/{language}/")
-async def translate_text(language: str, request: TranslationRequest):
-    if language not in supported_languages:
-        raise HTTPException(status_code=400, detail=f"Language '{language}' not found. Supported languages are: {', '.join(supported_languages)}")
+class BatchTranslationRequest(BaseModel):
+    text: str
+    languages: Optional[List[str]] = None
+    pack_size: Optional[int] = Field(default=None, ge=1)
+
+class JobItem(BaseModel):
+    project: str
+    text: str
+
+class JobRequest(BaseModel):
+    items: List[JobItem] = Field(min_length=1)
+    languages: Optional[List[str]] = None
+    pack_size: Optional[int] = Field(default=None, ge=1)
+
+class TranslationError(Exception):
+    pass
+
+# Defaults for every deployment, each of which gets its own quota and
+# concurrency limit. Completions in flight start at TRANSLATION_CONCURRENCY,
+# halve whenever Azure throttles and grow back towards the maximum on success
+translation_concurrency = int(os.getenv('TRANSLATION_CONCURRENCY', '10'))
+translation_max_concurrency = int(os.getenv('TRANSLATION_MAX_CONCURRENCY', str(translation_concurrency * 4)))
+
+# Azure deployment quota; 0 leaves the corresponding limit off
+requests_per_minute = int(os.getenv('AZURE_OPENAI_RPM', '0'))
+tokens_per_minute = int(os.getenv('AZURE_OPENAI_TPM', '0'))
+max_retries = int(os.getenv('TRANSLATION_MAX_RETRIES', '5'))
+backoff_base = float(os.getenv('TRANSLATION_BACKOFF_BASE', '0.5'))
+backoff_cap = float(os.getenv('TRANSLATION_BACKOFF_CAP', '30'))
+
+# How replies are constrained to JSON: "json_schema" (structured outputs),
+# "json_object" (JSON mode) or "none". Downgraded automatically, per
+# deployment, if the deployment or API version rejects it.
+response_format_modes = ["json_schema", "json_object", "none"]
+response_format_mode = os.getenv('TRANSLATION_RESPONSE_FORMAT', 'json_object')
+
+# Seconds a deployment that failed is routed around while others can serve
+failover_cooldown = float(os.getenv('TRANSLATION_FAILOVER_COOLDOWN', '30'))
+
+def build_rate_limiter(name, rpm, tpm):
+    if coordinator is not None:
+        return SharedRateLimiter(coordinator, name, requests_per_minute=rpm, tokens_per_minute=tpm)
+    return RateLimiter(requests_per_minute=rpm, tokens_per_minute=tpm)
+
+def build_deployment(config):
+    """Deployment from one AZURE_OPENAI_DEPLOYMENTS entry; missing keys fall back to the defaults above."""
+    deployment_model = config.get('model', model)
+    concurrency = int(config.get('concurrency', translation_concurrency))
+    max_concurrency = int(config.get('max_concurrency', max(translation_max_concurrency, concurrency)))
+    api_key_env = config.get('api_key_env')
+    return Deployment(
+        name=config.get('name') or config.get('deployment') or deployment_model,
+        client=openai.AsyncAzureOpenAI(
+            azure_endpoint=config.get('endpoint', endpoint),
+            api_key=os.getenv(api_key_env) if api_key_env else config.get('api_key', api_key),
+            api_version=config.get('api_version', api_version),
+            http_client=http_client,
+            # Retries are handled by create_completion so they respect the rate limiter
+            max_retries=0,
+        ),
+        model=deployment_model,
+        deployment=config.get('deployment', deployment_model),
+        rate_limiter=build_rate_limiter(
+            config.get('name') or config.get('deployment') or deployment_model,
+            int(config.get('rpm', requests_per_minute)),
+            int(config.get('tpm', tokens_per_minute)),
+        ),
+        concurrency=AdaptiveConcurrency(concurrency, minimum=1, maximum=max_concurrency),
+        response_format=config.get('response_format', response_format_mode),
+        languages=config.get('languages'),
+        min_text_tokens=int(config.get('min_text_tokens', 0)),
+        max_text_tokens=int(config['max_text_tokens']) if config.get('max_text_tokens') is not None else None,
+        priority=int(config.get('priority', 0)),
+    )
+
+# Deployments to route completions across, as a JSON list. For example, two
+# regions of gpt-4o with gpt-4o-mini preferred for short segments:
+# [{"name": "mini", "model": "gpt-4o-mini", "max_text_tokens": 200, "tpm": 200000},
+#  {"name": "eastus", "priority": 1, "tpm": 450000},
+#  {"name": "westeu", "priority": 1, "endpoint": "https://...", "api_key_env": "WESTEU_KEY"}]
+# Unset, the single deployment configured above is used.
+deployments_config = json.loads(os.getenv('AZURE_OPENAI_DEPLOYMENTS') or '[{}]')
+latency_smoothing = float(os.getenv('TRANSLATION_LATENCY_SMOOTHING', '0.2'))
+
+def build_router():
+    return Router([build_deployment(config) for config in deployments_config], smoothing=latency_smoothing)
+
+# Priority lanes sharing each deployment's concurrency and quota. While both
+# have work queued, interactive gets TRANSLATION_LANE_WEIGHTS times bulk's
+# share of tokens, and bulk never holds more than its max share of the slots.
+# Requests are interactive unless they say otherwise; batch jobs run as bulk.
+lane_weights = {"interactive": 4.0, "bulk": 1.0, **parse_lane_settings(os.getenv('TRANSLATION_LANE_WEIGHTS'))}
+lane_max_shares = {"bulk": 0.75, **parse_lane_settings(os.getenv('TRANSLATION_LANE_MAX_SHARE'))}
+scheduler = LaneScheduler([
+    Lane(name, weight=weight, max_share=lane_max_shares.get(name, 1.0))
+    for name, weight in lane_weights.items()
+])
+
+# Longer segments are split into chunks translated concurrently and reassembled in order
+max_chunk_tokens = int(os.getenv('TRANSLATION_MAX_CHUNK_TOKENS', '1000'))
+
+# Number of target languages packed into one completion for batch jobs (1 disables packing)
+translation_pack_size = int(os.getenv('TRANSLATION_PACK_SIZE', '1'))
+
+# System prompts share a static prefix ahead of the per-language lines so
+# Azure OpenAI's prompt cache can serve it. An optional glossary file joins
+# the prefix. Changing any template invalidates cached translations.
+glossary_path = os.getenv('TRANSLATION_GLOSSARY_PATH')
+glossary = None
+if glossary_path:
+    with open(glossary_path, encoding='utf-8') as f:
+        glossary = f.read()
+prompts = PromptRegistry(supported_languages, glossary=glossary)
+prompt_version = prompts.version
+
+def check_languages(languages):
+    unknown = [language for language in languages if language not in supported_languages]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Language '{', '.join(unknown)}' not found. Supported languages are: {', '.join(supported_languages)}")
+
+def estimate_request_tokens(messages, text, languages=1):
+    """Prompt plus expected completion, assuming each translation is about as long as the source."""
+    return sum(estimate_tokens(message["content"]) for message in messages) + estimate_tokens(text) * languages
+
+def translation_messages(sys_msg, text):
+    return [
+        {"role": "system", "content": sys_msg},
+        {"role": "user", "content": text},
+    ]
+
+def response_format_options(deployment, languages):
+    if deployment.response_format == "json_schema":
+        return {"response_format": {"type": "json_schema", "json_schema": response_schema(languages)}}
+    if deployment.response_format == "json_object":
+        return {"response_format": {"type": "json_object"}}
+    return {}
+
+def downgrade_response_format(deployment):
+    index = response_format_modes.index(deployment.response_format)
+    deployment.response_format = response_format_modes[min(index + 1, len(response_format_modes) - 1)]
+    logger.warning(f"Response format not supported by {deployment.name}, falling back to {deployment.response_format}")
+
+async def create_completion(messages, text, languages, **kwargs):
+    """Call the model on the best deployment for the request, asking for JSON keyed by ``languages``.
+
+    Returns ``(response, deployment)``. Each call waits for the deployment's
+    quota and a concurrency slot. Throttled (429) and transient failures are
+    retried, on another deployment when one can take the request and
+    otherwise with exponential backoff and jitter, honouring Retry-After. A
+    rejected response_format is downgraded and retried straight away.
+
+    Capacity is shared between lanes by the scheduler. When streaming, the
+    slot is still held on return and the caller must hand it back with
+    ``scheduler.release`` once the stream has been consumed.
+    """
+    lane = current_lane.get()
+    estimated_tokens = estimate_request_tokens(messages, text, len(languages))
+    text_tokens = estimate_tokens(text)
+    attempt = 0
+    failed = None
+    delay = 0
+    while True:
+        deployment = router.choose(languages, text_tokens, estimated_tokens)
+        if deployment is failed:
+            await asyncio.sleep(delay)
+        elif failed is not None:
+            logger.info(f"Failing over from {failed.name} to {deployment.name}")
+
+        queued = time.monotonic()
+        await scheduler.acquire(deployment, lane, estimated_tokens)
+        release = True
+        try:
+            options = response_format_options(deployment, languages)
+            started = time.monotonic()
+            metrics.queue_wait.labels(deployment.name, lane).observe(started - queued)
+            record_span("queue", started - queued)
+            with span("upstream"):
+                response = await deployment.client.chat.completions.create(
+                    model=deployment.deployment,
+                    messages=messages,
+                    temperature=0,
+                    **options,
+                    **kwargs,
+                )
+        except openai.BadRequestError as e:
+            if not options or "response_format" not in str(e):
+                raise
+            downgrade_response_format(deployment)
+            metrics.retries.labels(deployment.name, "response_format").inc()
+            continue
+        except openai.RateLimitError as e:
+            metrics.throttled.labels(deployment.name).inc()
+            deployment.concurrency.record_throttle()
+            retry_after = retry_after_seconds(e.response.headers)
+            if retry_after is not None:
+                deployment.rate_limiter.pause(retry_after)
+            if attempt >= max_retries:
+                raise
+            delay = backoff_delay(attempt, backoff_base, backoff_cap, retry_after)
+            deployment.record_failure(delay)
+            metrics.retries.labels(deployment.name, "throttled").inc()
+            logger.warning(f"Rate limited by {deployment.name}, retrying in {delay:.1f}s")
+        except (openai.APIConnectionError, openai.InternalServerError) as e:
+            if attempt >= max_retries:
+                raise
+            delay = backoff_delay(attempt, backoff_base, backoff_cap)
+            deployment.record_failure(failover_cooldown)
+            metrics.retries.labels(deployment.name, "error").inc()
+            logger.warning(f"Request to {deployment.name} failed ({str(e)}), retrying in {delay:.1f}s")
+        else:
+            # For streams this is the time until the reply starts
+            elapsed = time.monotonic() - started
+            router.record_latency(deployment, elapsed)
+            metrics.upstream_latency.labels(deployment.name, str(bool(kwargs.get("stream"))).lower()).observe(elapsed)
+            deployment.concurrency.record_success()
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                deployment.rate_limiter.settle(estimated_tokens, usage.total_tokens)
+                record_usage(usage, languages)
+            release = not kwargs.get("stream")
+            return response, deployment
+        finally:
+            if release:
+                await scheduler.release(deployment, lane)
+        failed = deployment
+        attempt += 1
+
+def record_usage(usage, languages):
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", None) or 0
+    prompts.record_usage(usage.prompt_tokens, cached_tokens)
+    for language in languages:
+        metrics.tokens.labels(language, "prompt").inc(usage.prompt_tokens / len(languages))
+        metrics.tokens.labels(language, "cached_prompt").inc(cached_tokens / len(languages))
+        metrics.tokens.labels(language, "completion").inc(usage.completion_tokens / len(languages))
+
+def parse_translations(content, languages):
+    started = time.monotonic()
+    with span("parse"):
+        translations = extract_translations(content, languages)
+    metrics.parse_latency.observe(time.monotonic() - started)
+    return translations
+
+async def complete(messages, text, languages):
+    """Run one completion and return its raw reply, the translations recovered from it and the model used."""
+    if debug_logging:
+        logger.debug(f"Request to OpenAI: {messages[0]['content']}")
+
+    response, deployment = await create_completion(messages, text, languages)
+
+    if debug_logging:
+        logger.debug(f"OpenAI response from {deployment.name}: {response}")
+
+    content = response.choices[0].message.content or ""
+    translations = parse_translations(content, languages)
+    if len(translations) < len(languages):
+        logger.error(f"Could not read {', '.join(set(languages) - set(translations))} from response: {content}")
+    return content, translations, deployment.model
+
+async def translate_uncached_stream(segment, language):
+    """Translate one segment, yielding the translation piece by piece as it is generated."""
+    sys_msg = prompts.translate(language)
+
+    if debug_logging:
+        logger.debug(f"Streaming translation to {language}")
+        logger.debug(f"Request to OpenAI: {sys_msg}")
+
+    messages = translation_messages(sys_msg, segment)
+    extractor = JsonStringExtractor(language)
+    stream, deployment = await create_completion(
+        messages, segment, [language], stream=True, stream_options={"include_usage": True},
+    )
+    try:
+        async for chunk in stream:
+            # Usage arrives in a last chunk without choices
+            if getattr(chunk, "usage", None) is not None:
+                deployment.rate_limiter.settle(estimate_request_tokens(messages, segment), chunk.usage.total_tokens)
+                record_usage(chunk.usage, [language])
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            piece = extractor.feed(chunk.choices[0].delta.content)
+            if piece:
+                yield piece
+    finally:
+        await scheduler.release(deployment, current_lane.get())
+
+    if extractor.finished:
+        translation = extractor.text
+        await remember_translation(segment, language, deployment.model, translation)
+    elif extractor.started:
+        # The value broke off: ask again without streaming, then send what
+        # was missing, or the whole segment if the new reply differs
+        logger.warning(f"Truncated {language} translation in response, retrying without streaming")
+        translation = await request_translation(segment, language)
+        if translation.startswith(extractor.text):
+            yield translation[len(extractor.text):]
+        else:
+            yield Replacement(translation)
+    else:
+        # Nothing streamed: the reply did not follow the expected layout
+        translation = parse_translations(extractor.buffer, [language]).get(language)
+        if translation is None:
+            translation = await repair_translation(segment, language, messages, extractor.buffer)
+        else:
+            await remember_translation(segment, language, deployment.model, translation)
+        yield translation
+
+async def cached_translation(segment, language):
+    """Translation memory entry from any model the router could send this segment to."""
+    def lookup():
+        for candidate in router.models([language], estimate_tokens(segment)):
+            cached = translation_cache.get(segment, language, candidate, prompt_version)
+            if cached is not None:
+                return cached
+        return None
+
+    # The SQLite tier is shared with other worker processes
+    with span("cache"):
+        cached = await asyncio.to_thread(lookup)
+    metrics.cache_lookups.labels("hit" if cached is not None else "miss").inc()
+    return cached
+
+async def remember_translation(segment, language, model, translation):
+    """Store a translation in translation memory; a failed write only loses the entry."""
+    try:
+        await asyncio.to_thread(translation_cache.set, segment, language, model, prompt_version, translation)
+    except Exception as e:
+        logger.error(f"Storing the {language} translation in translation memory failed: {str(e)}")
+
+async def stream_across_workers(key, segment, language):
+    """Stream a translation, unless another worker process is already translating the segment."""
+    if coordinator is not None:
+        cached = await claim_across_workers(key, segment, language)
+        if cached is not None:
+            yield cached
+            return
+    try:
+        async for piece in translate_uncached_stream(segment, language):
+            yield piece
+    finally:
+        if coordinator is not None:
+            await asyncio.to_thread(coordinator.release, key)
+
+async def translate_segment(segment, language):
+    cached = await cached_translation(segment, language)
+    if cached is not None:
+        logger.debug(f"Translation memory hit for {language}")
+        return cached
+    return await translate_uncached(segment, language)
+
+def translation_key(segment, language):
+    return cache_key(segment, language, router.models([language], estimate_tokens(segment))[0], prompt_version)
+
+async def translate_uncached(segment, language):
+    key = translation_key(segment, language)
+    return await single_flight.do(key, lambda: request_across_workers(key, segment, language))
+
+async def claim_across_workers(key, segment, language):
+    """Claim ``key`` for this worker process, or return the translation another worker finished meanwhile."""
+    # Coordinator and job queue calls run in a thread: they may wait on
+    # another process's SQLite lock
+    while not await asyncio.to_thread(coordinator.claim, key, flight_ttl):
+        while await asyncio.to_thread(coordinator.claimed, key):
+            await asyncio.sleep(flight_poll_interval)
+        cached = await cached_translation(segment, language)
+        if cached is not None:
+            return cached
+    # Another worker may have finished and released it since our lookup
+    cached = await cached_translation(segment, language)
+    if cached is not None:
+        await asyncio.to_thread(coordinator.release, key)
+    return cached
+
+async def request_across_workers(key, segment, language):
+    if coordinator is None:
+        return await request_translation(segment, language)
+    cached = await claim_across_workers(key, segment, language)
+    if cached is not None:
+        return cached
+    try:
+        return await request_translation(segment, language)
+    finally:
+        await asyncio.to_thread(coordinator.release, key)
+
+async def request_translation(segment, language):
+    sys_msg = prompts.translate(language)
+    messages = translation_messages(sys_msg, segment)
+
+    logger.debug(f"Translating text to {language}")
+    content, translations, used_model = await complete(messages, segment, [language])
 
-    sys_msg = f'''You are a helpful assistant whose role is to translate English text to {language}.
+    if language not in translations:
+        return await repair_translation(segment, language, messages, content)
+    translation = translations[language]
+    await remember_translation(segment, language, used_model, translation)
+    return translation
 
-    Please provide the translation in a valid JSON format like this:
-    {{
-        "{language}": "translation"
-    }}
-    '''
+async def repair_translation(segment, language, messages, content):
+    """Ask once more for an unreadable reply, showing the model what it sent."""
+    logger.info(f"Asking for a corrected {language} reply")
+    messages = messages + [
+        {"role": "assistant", "content": content},
+        {"role": "user", "content": prompts.repair(language)},
+    ]
+    _, translations, used_model = await complete(messages, segment, [language])
 
+    if language not in translations:
+        raise TranslationError(f"No {language} translation in response")
+    await remember_translation(segment, language, used_model, translations[language])
+    return translations[language]
+
+async def translate_packed(segment, languages):
+    """Translate one segment into several languages with one completion.
+
+    Returns the result for each language, either its translation or the
+    exception raised for it; it never raises for an upstream error. Languages
+    missing from the reply, or whose value is not a string, are retried one
+    at a time, and so are all of them if the packed completion fails.
+    Languages another request is already translating, in this worker
+    process or another one, share that request's result.
+    """
+    translations = {}
+    for language in languages:
+        cached = await cached_translation(segment, language)
+        if cached is not None:
+            translations[language] = cached
+    languages = [language for language in languages if language not in translations]
+
+    # Languages someone else is already translating are awaited, not requested again
+    joined = {}
+    for language in languages:
+        future = single_flight.join(translation_key(segment, language))
+        if future is not None:
+            joined[language] = future
+    languages = [language for language in languages if language not in joined]
+
+    if len(languages) == 1:
+        results = await asyncio.gather(translate_uncached(segment, languages[0]), return_exceptions=True)
+        translations.update(zip(languages, results))
+    elif languages:
+        for language in languages:
+            single_flight.lead(translation_key(segment, language))
+        claimed = []
+        try:
+            if coordinator is not None:
+                # Claimed in key order, so workers packing overlapping
+                # languages never wait on each other's claims
+                for language in sorted(languages, key=lambda language: translation_key(segment, language)):
+                    key = translation_key(segment, language)
+                    cached = await claim_across_workers(key, segment, language)
+                    if cached is None:
+                        claimed.append(key)
+                    else:
+                        translations[language] = cached
+            pending = [language for language in languages if language not in translations]
+            if pending:
+                translations.update(await request_packed_translation(segment, pending))
+        except asyncio.CancelledError:
+            for language in languages:
+                single_flight.finish(translation_key(segment, language), error=LeaderCancelled())
+            raise
+        except Exception as e:
+            # Settle every led key, or later requests for them would wait forever
+            translations.update({language: e for language in languages if language not in translations})
+        finally:
+            for key in claimed:
+                await asyncio.to_thread(coordinator.release, key)
+        for language in languages:
+            result = translations[language]
+            if isinstance(result, Exception):
+                single_flight.finish(translation_key(segment, language), error=result)
+            else:
+                single_flight.finish(translation_key(segment, language), result)
+
+    for language, future in joined.items():
+        try:
+            translations[language] = await single_flight.wait(future)
+        except LeaderCancelled:
+            translations[language] = await translate_uncached(segment, language)
+        except Exception as e:
+            translations[language] = e
+    return translations
+
+async def request_packed_translation(segment, languages):
+    sys_msg = prompts.packed(tuple(languages))
+
+    logger.debug(f"Translating text to {', '.join(languages)}")
     try:
-        logger.info(f"Translating text to {language}")
-        logger.info(f"Request to OpenAI: {sys_msg}")
-
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": sys_msg},
-                {"role": "user", "content": request.text},
-            ],
-            temperature=0,
+        _, translations, used_model = await complete(translation_messages(sys_msg, segment), segment, languages)
+    except Exception as e:
+        logger.warning(f"Packed translation to {', '.join(languages)} failed ({str(e)})")
+        translations = {}
+
+    for language, translation in translations.items():
+        await remember_translation(segment, language, used_model, translation)
+    missing = [language for language in languages if language not in translations]
+    if missing:
+        logger.info(f"Retrying missing languages individually: {', '.join(missing)}")
+        results = await asyncio.gather(
+            *(request_translation(segment, language) for language in missing),
+            return_exceptions=True,
         )
+        translations.update(zip(missing, results))
+    return translations
+
+def split_document(text):
+    """Split a document into block-level segments, chunking any that are too long."""
+    return chunk_parts(split_segments(text), max_chunk_tokens)
+
+async def translate(text, language):
+    """Translate an HTML document segment by segment, reusing translation memory."""
+    parts = split_document(text)
+    segments = unique_segments(parts)
+    results = await asyncio.gather(*(translate_segment(segment, language) for segment in segments))
+    return join_segments(parts, dict(zip(segments, results)))
+
+async def translate_languages(text, languages, pack_size=1):
+    """Translate an HTML document into several languages.
+
+    Returns the result for each language, either the translated document or
+    the first exception raised while translating one of its segments.
+    """
+    parts = split_document(text)
+    segments = unique_segments(parts)
+    packs = [languages[i:i + pack_size] for i in range(0, len(languages), pack_size)]
+
+    async def translate_all_packs(segment):
+        translations = {}
+        for packed_results in await asyncio.gather(*(translate_packed(segment, pack) for pack in packs)):
+            translations.update(packed_results)
+        return translations
+
+    try:
+        segment_results = dict(zip(segments, await asyncio.gather(*(translate_all_packs(segment) for segment in segments))))
+    except Exception as e:
+        # Reported per language, like any other failure, so batches keep their error contract
+        logger.error(f"Translation to {', '.join(languages)} failed: {str(e)}")
+        return {language: e for language in languages}
+
+    results = {}
+    for language in languages:
+        translations = {segment: segment_results[segment][language] for segment in segments}
+        error = next((result for result in translations.values() if isinstance(result, Exception)), None)
+        results[language] = error or join_segments(parts, translations)
+    return results
+
+@app.post("/translate/batch")
+async def translate_batch(request: BatchTranslationRequest):
+    languages = request.languages or supported_languages
+    check_languages(languages)
+    # Preserve order while dropping duplicates
+    languages = list(dict.fromkeys(languages))
+
+    results = await translate_languages(request.text, languages, request.pack_size or translation_pack_size)
+
+    translations = {}
+    errors = {}
+    for language in languages:
+        result = results[language]
+        if isinstance(result, Exception):
+            logger.error(f"Batch translation to {language} failed: {str(result)}")
+            errors[language] = str(result)
+        else:
+            translations[language] = result
+
+    return {"translations": translations, "errors": errors}
+
+@app.post("/translate/batch/stream")
+async def translate_batch_stream(request: BatchTranslationRequest):
+    languages = request.languages or supported_languages
+    check_languages(languages)
+    languages = list(dict.fromkeys(languages))
+
+    pack_size = request.pack_size or translation_pack_size
+    packs = [languages[i:i + pack_size] for i in range(0, len(languages), pack_size)]
+
+    async def events():
+        tasks = [asyncio.create_task(translate_languages(request.text, pack, pack_size)) for pack in packs]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                for language, result in (await finished).items():
+                    if isinstance(result, Exception):
+                        logger.error(f"Batch translation to {language} failed: {str(result)}")
+                        yield sse_event("error", {"language": language, "detail": str(result)})
+                    else:
+                        yield sse_event("translation", {"language": language, "text": result})
+            yield sse_event("done", {})
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+async def run_job_worker():
+    current_lane.set("bulk")
+    failures = 0
+    while True:
+        try:
+            await run_job_step()
+            failures = 0
+        except Exception as e:
+            # Items claimed by a failed step are requeued once their lease runs out
+            delay = backoff_delay(failures, job_poll_interval, job_retry_delay)
+            failures += 1
+            logger.error(f"Job worker step failed ({str(e)}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+async def run_job_step():
+    """Translate one claimed text, or wait for work if there is none."""
+    claimed = await asyncio.to_thread(job_queue.claim, job_lease)
+    if claimed is None:
+        await asyncio.to_thread(job_queue.recover)
+        try:
+            await save_job_results()
+        except Exception as e:
+            logger.error(f"Saving job results failed: {str(e)}")
+        job_available.clear()
+        try:
+            await asyncio.wait_for(job_available.wait(), job_poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        return
+
+    job_id, project, text, pack_size, items = claimed
+    try:
+        results = await translate_languages(text, list(items.values()), pack_size)
+    except Exception as e:
+        results = {language: e for language in items.values()}
+    for item_id, language in items.items():
+        result = results[language]
+        if isinstance(result, Exception):
+            logger.error(f"Job {job_id} translation of {project} to {language} failed: {str(result)}")
+            await asyncio.to_thread(job_queue.fail, item_id, str(result), job_max_attempts, job_retry_delay)
+        else:
+            await asyncio.to_thread(job_queue.complete, item_id, result)
+
+    try:
+        await save_job_results()
+    except Exception as e:
+        # Results stay marked unsaved and are written by the next flush
+        logger.error(f"Saving job results failed: {str(e)}")
+
+async def save_job_results():
+    """Write finished job items into the translations table in bulk."""
+    if job_save_lock.locked():
+        # The flush in progress keeps going until nothing is left unsaved
+        return
+    async with job_save_lock:
+        while rows := await asyncio.to_thread(job_queue.unsaved_results):
+            await asyncio.to_thread(
+                translation_store.save_rows,
+                [
+                    {
+                        "project": row["project"],
+                        "language": row["language"],
+                        "original_text": row["text"],
+                        "translation": row["translation"],
+                    }
+                    for row in rows
+                ],
+            )
+            await asyncio.to_thread(job_queue.mark_saved, [row["id"] for row in rows])
+
+@app.post("/jobs")
+async def submit_job(request: JobRequest):
+    languages = request.languages or supported_languages
+    check_languages(languages)
+    languages = list(dict.fromkeys(languages))
+
+    job_id = await asyncio.to_thread(
+        job_queue.submit,
+        [item.model_dump() for item in request.items],
+        languages,
+        request.pack_size or translation_pack_size,
+    )
+    job_available.set()
+    return {"job_id": job_id, "total": len(request.items) * len(languages)}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    progress = await asyncio.to_thread(job_queue.progress, job_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return progress
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job(job_id: str):
+    """Stream job progress as Server-Sent Events until the job finishes."""
+    if await asyncio.to_thread(job_queue.progress, job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+
+    async def events():
+        last = None
+        while True:
+            progress = await asyncio.to_thread(job_queue.progress, job_id)
+            if progress != last:
+                yield sse_event("progress", progress)
+                last = progress
+            if progress["status"] in ("completed", "completed_with_errors"):
+                yield sse_event("done", {"job_id": job_id, "status": progress["status"]})
+                return
+            await asyncio.sleep(job_poll_interval)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+def check_transfer_format(format):
+    if format not in transfer.MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Format '{format}' not supported. Supported formats are: {', '.join(transfer.MEDIA_TYPES)}")
+
+@app.get("/translations/export")
+async def export_translations(
+    format: str = "jsonl",
+    project: Optional[str] = None,
+    language: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """Stream stored translations as JSONL, CSV or XLIFF, filtered by project, language and date_added."""
+    check_transfer_format(format)
+    rows = translation_store.iter_translations(
+        project=project, language=language, since=since, until=until, batch_size=export_batch_size,
+    )
+    # A plain generator: Starlette pulls it from a worker thread, so the
+    # database cursor never blocks the event loop
+    return StreamingResponse(
+        transfer.export_chunks(rows, format, source_language),
+        media_type=transfer.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="translations.{format}"'},
+    )
+
+def seed_translation_memory(rows):
+    """Store imported translations segment by segment in translation memory; returns the segment count.
+
+    Only documents whose translation keeps the block structure of the
+    original can be split into matching segments.
+    """
+    entries = []
+    for row in rows:
+        for segment, translation in align_segments(row["original_text"], row["translation"]) or ():
+            tokens = estimate_tokens(segment)
+            models = router.models([row["language"]], tokens)
+            # Longer segments are chunked before lookup, so they would never match
+            if models and tokens <= max_chunk_tokens:
+                entries.append((segment, row["language"], models[0], prompt_version, translation))
+    translation_cache.set_many(entries)
+    return len(entries)
+
+def import_rows(rows, seed_memory):
+    """Save rows into the translations table, ``import_batch_size`` per transaction."""
+    summary = {"imported": 0, "skipped": 0, "memory_segments": 0, "failed": False, "errors": []}
+    batch = []
+
+    def flush():
+        translation_store.save_rows(batch)
+        summary["imported"] += len(batch)
+        if seed_memory:
+            summary["memory_segments"] += seed_translation_memory(batch)
+        batch.clear()
+
+    number = 0
+    try:
+        for number, row in enumerate(rows, 1):
+            missing = [field for field in ("project", "language", "original_text", "translation") if not row.get(field)]
+            if missing:
+                summary["skipped"] += 1
+                if len(summary["errors"]) < 20:
+                    summary["errors"].append({"row": number, "detail": f"Missing {', '.join(missing)}"})
+                continue
+            batch.append(row)
+            if len(batch) >= import_batch_size:
+                flush()
+    except ValueError as e:
+        summary["errors"].append({"row": number + 1, "detail": str(e)})
+        summary["failed"] = True
+    if batch:
+        flush()
+    return summary
+
+@app.post("/translations/import")
+async def import_translations(request: Request, format: str = "jsonl", memory: bool = True):
+    """Bulk-load translations sent as the request body in the export formats.
+
+    Each (project, language) replaces any stored translation. With
+    ``memory``, aligned segments also seed translation memory. Rows are
+    committed batch by batch; unreadable content stops the import with
+    a 400 reporting what was already imported.
+    """
+    check_transfer_format(format)
+    with tempfile.SpooledTemporaryFile(max_size=import_spool_bytes) as upload:
+        async for chunk in request.stream():
+            upload.write(chunk)
+        upload.seek(0)
+        summary = await asyncio.to_thread(import_rows, transfer.read_rows(upload, format), memory)
+    logger.info(f"Imported {summary['imported']} translations, skipped {summary['skipped']}, seeded {summary['memory_segments']} segments")
+    return JSONResponse(status_code=400 if summary["failed"] else 200, content=summary)
 
-        logger.info(f"OpenAI response: {response}")
+@app.get("/cache/stats")
+async def cache_stats():
+    return {**translation_cache.stats(), "single_flight": single_flight.stats()}
 
-        translated_text = response.choices[0].message.content.strip()
-        cleaned_text = re.sub(r'```json|```', '', translated_text).strip()
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving requests."""
+    return {"status": "ok"}
 
+@app.get("/readyz")
+async def readyz():
+    """Readiness: started and shared state reachable.
+
+    Deployments cooling down after a failure are listed but do not fail
+    readiness: the router still sends them traffic when nothing else can
+    serve it.
+    """
+    if not ready:
+        raise HTTPException(status_code=503, detail="Not started")
+    if coordinator is not None:
         try:
-            translated_json = json.loads(cleaned_text)
-        except json.JSONDecodeError:
-            logger.error(f"JSON Decode Error: {cleaned_text}")
-            raise HTTPException(status_code=500, detail="Invalid JSON format in response")
+            await asyncio.to_thread(coordinator.ping)
+        except Exception as e:
+            raise HTTPException(status_code=503, detail=f"Coordinator unavailable: {str(e)}")
+    healthy = [deployment.name for deployment in router.deployments if deployment.healthy()]
+    cooling_down = [deployment.name for deployment in router.deployments if not deployment.healthy()]
+    return {"status": "ready", "deployments": healthy, "cooling_down": cooling_down}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    content, content_type = metrics.latest()
+    return Response(content=content, media_type=content_type)
+
+@app.get("/prompts/stats")
+async def prompt_stats():
+    return prompts.stats()
+
+@app.get("/lanes/stats")
+async def lane_stats():
+    return scheduler.stats()
+
+@app.get("/deployments/stats")
+async def deployment_stats():
+    return {"deployments": router.stats()}
 
-        return {"translated_text": translated_json}
+@app.post("/translate/{language}/")
+async def translate_text(language: str, request: TranslationRequest):
+    check_languages([language])
 
+    try:
+        translation = await translate(request.text, language)
+        return {"translated_text": {language: translation}}
+
+    except openai.RateLimitError as e:
+        logger.error(f"Rate limited translating to {language}: {str(e)}")
+        retry_after = retry_after_seconds(e.response.headers)
+        headers = {"Retry-After": str(int(retry_after) + 1)} if retry_after is not None else None
+        raise HTTPException(status_code=429, detail="Azure OpenAI quota exceeded, please retry later", headers=headers)
     except Exception as e:
         logger.error(f"Exception for Arash: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/translate/{language}/stream")
+async def translate_text_stream(language: str, request: TranslationRequest):
+    """Stream a translation as Server-Sent Events.
+
+    ``delta`` events carry consecutive pieces of the translated document, in
+    order, so concatenating them yields the full translation. A ``replace``
+    event carries the whole translation so far, superseding every earlier
+    piece; it is sent when a segment has to be translated again after its
+    streamed reply broke off. The stream ends with a ``done`` event, or an
+    ``error`` event if a segment failed.
+    """
+    check_languages([language])
+
+    parts = split_document(request.text)
+
+    async def stream_segment(segment, queue):
+        try:
+            cached = await cached_translation(segment, language)
+            if cached is not None:
+                queue.put_nowait(cached)
+                return cached
+
+            key = translation_key(segment, language)
+            future = single_flight.join(key)
+            if future is not None:
+                try:
+                    translation = await single_flight.wait(future)
+                    queue.put_nowait(translation)
+                    return translation
+                except LeaderCancelled:
+                    pass
+
+            single_flight.lead(key)
+            pieces = []
+            try:
+                async for piece in stream_across_workers(key, segment, language):
+                    if isinstance(piece, Replacement):
+                        pieces.clear()
+                    pieces.append(piece)
+                    queue.put_nowait(piece)
+            except asyncio.CancelledError:
+                single_flight.finish(key, error=LeaderCancelled())
+                raise
+            except Exception as e:
+                single_flight.finish(key, error=e)
+                raise
+            translation = "".join(pieces)
+            single_flight.finish(key, translation)
+            return translation
+        finally:
+            queue.put_nowait(None)
+
+    async def events():
+        # Every segment starts translating right away; their output is
+        # buffered in per-segment queues and forwarded in document order.
+        queues = {segment: asyncio.Queue() for segment in unique_segments(parts)}
+        tasks = {segment: asyncio.create_task(stream_segment(segment, queue)) for segment, queue in queues.items()}
+        forwarded = set()
+        # Everything sent so far, which a replace event restates
+        sent = []
+        try:
+            for fragment, translatable in parts:
+                if not translatable:
+                    sent.append(fragment)
+                    yield sse_event("delta", {"text": fragment})
+                elif fragment in forwarded:
+                    translation = await tasks[fragment]
+                    sent.append(translation)
+                    yield sse_event("delta", {"text": translation})
+                else:
+                    forwarded.add(fragment)
+                    start = len(sent)
+                    while (piece := await queues[fragment].get()) is not None:
+                        if isinstance(piece, Replacement):
+                            del sent[start:]
+                            sent.append(piece)
+                            yield sse_event("replace", {"text": "".join(sent)})
+                        else:
+                            sent.append(piece)
+                            yield sse_event("delta", {"text": piece})
+                    await tasks[fragment]
+            yield sse_event("done", {"language": language})
+        except Exception as e:
+            logger.error(f"Streaming translation to {language} failed: {str(e)}")
+            yield sse_event("error", {"language": language, "detail": str(e)})
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=80)
+    uvicorn.run("main:app", host="0.0.0.0", port=80, workers=worker_processes)
@@ -0,0 +1,78 @@
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+
+# With several worker processes, each writes its samples to files in this
+# directory and /metrics merges them. It must exist before prometheus_client loads.
+multiprocess_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+if multiprocess_dir:
+    os.makedirs(multiprocess_dir, exist_ok=True)
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+PARSE_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1)
+
+request_latency = Histogram(
+    'translation_request_seconds', 'End-to-end latency of HTTP requests, until the last byte is sent',
+    ['route', 'status'], buckets=LATENCY_BUCKETS,
+)
+upstream_latency = Histogram(
+    'translation_upstream_seconds', 'Azure OpenAI call latency; for streams, until the reply starts',
+    ['deployment', 'stream'], buckets=LATENCY_BUCKETS,
+)
+queue_wait = Histogram(
+    'translation_queue_wait_seconds', 'Time a completion waited for a concurrency slot and quota',
+    ['deployment', 'lane'], buckets=LATENCY_BUCKETS,
+)
+lane_queue_depth = Gauge(
+    'translation_lane_queue_depth', 'Completions waiting for capacity', ['lane'], multiprocess_mode='livesum',
+)
+lane_in_flight = Gauge(
+    'translation_lane_in_flight', 'Completions holding a concurrency slot', ['lane'], multiprocess_mode='livesum',
+)
+parse_latency = Histogram(
+    'translation_parse_seconds', 'Time spent extracting translations from a model reply',
+    buckets=PARSE_BUCKETS,
+)
+tokens = Counter(
+    'translation_tokens_total', 'Tokens reported by Azure OpenAI, split evenly across packed languages',
+    ['language', 'kind'],
+)
+cache_lookups = Counter('translation_cache_lookups_total', 'Translation memory lookups', ['result'])
+retries = Counter('translation_retries_total', 'Completions retried', ['deployment', 'reason'])
+throttled = Counter('translation_throttled_total', 'Completions rejected with 429', ['deployment'])
+
+# Timings of the request being served, shared with the tasks it starts
+request_spans = contextvars.ContextVar('request_spans', default=None)
+
+
+def record_span(name, seconds):
+    """Add a stage timing to the current request; repeated stages are summed."""
+    spans = request_spans.get()
+    if spans is not None:
+        count, total = spans.get(name, (0, 0.0))
+        spans[name] = (count + 1, total + seconds)
+
+
+@contextmanager
+def span(name):
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        record_span(name, time.monotonic() - started)
+
+
+def span_summary(spans):
+    return {name: {"count": count, "seconds": round(seconds, 4)} for name, (count, seconds) in spans.items()}
+
+
+def latest():
+    """Current metrics in the Prometheus text format, with its content type."""
+    if multiprocess_dir:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
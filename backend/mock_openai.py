@@ -0,0 +1,205 @@
+"""Local stand-in for the Azure OpenAI chat completions API.
+
+Replies with a fake translation for every language the prompt asks for,
+so the backend and the benchmark can run with no network and no spend:
+
+    python mock_openai.py
+    AZURE_OPENAI_ENDPOINT=http://localhost:9000 AZURE_OPENAI_API_KEY=mock \
+        AZURE_OPENAI_API_VERSION=2024-08-01-preview uvicorn main:app
+
+Behaviour is configured with MOCK_* environment variables, see below.
+"""
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+import uuid
+from chunking import estimate_tokens
+from ratelimit import TokenBucket
+
+app = FastAPI()
+
+# Latency before the first token is lognormal around the median; each
+# completion token then takes MOCK_SECONDS_PER_TOKEN
+latency_median = float(os.getenv('MOCK_LATENCY_MEDIAN', '0.5'))
+latency_sigma = float(os.getenv('MOCK_LATENCY_SIGMA', '0.5'))
+seconds_per_token = float(os.getenv('MOCK_SECONDS_PER_TOKEN', '0.005'))
+# Reading each prompt token that is not served from the prompt cache
+seconds_per_prompt_token = float(os.getenv('MOCK_SECONDS_PER_PROMPT_TOKEN', '0.0002'))
+
+# Prompt caching as Azure does it: prompts of at least 1024 tokens reuse the
+# longest previously seen prefix, in 128-token steps
+prompt_cache_minimum = 1024
+prompt_cache_step = 128
+prompt_cache_size = int(os.getenv('MOCK_PROMPT_CACHE_SIZE', '10000'))
+
+# Deployment quota, enforced like Azure with 429 and Retry-After; 0 disables
+requests_per_minute = int(os.getenv('MOCK_RPM', '0'))
+tokens_per_minute = int(os.getenv('MOCK_TPM', '0'))
+
+# Fraction of calls answered with an injected 429, or with a reply that is not valid JSON
+throttle_rate = float(os.getenv('MOCK_429_RATE', '0'))
+malformed_rate = float(os.getenv('MOCK_MALFORMED_RATE', '0'))
+
+request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+counters = {
+    "calls": 0, "streamed": 0, "throttled": 0, "malformed": 0,
+    "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0,
+}
+prompt_prefixes = {}
+
+LANGUAGE_KEY_RE = re.compile(r'"([A-Z][a-z]+)"\s*:\s*"translation"')
+
+
+def requested_languages(body):
+    """Languages the prompt asks for, from the JSON schema or the example in the prompt."""
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        return response_format["json_schema"]["schema"]["required"]
+    # A repair turn repeats the example in the last message
+    for message in reversed(body["messages"]):
+        languages = LANGUAGE_KEY_RE.findall(message["content"])
+        if languages:
+            return languages
+    return []
+
+
+def source_text(messages):
+    user_messages = [message["content"] for message in messages if message["role"] == "user"]
+    return user_messages[0] if user_messages else ""
+
+
+def cached_prefix_tokens(messages):
+    """Tokens of this prompt's longest cached prefix, remembering its prefixes for later calls."""
+    prompt = "".join(message["content"] for message in messages)
+    # estimate_tokens counts about four characters per token
+    step = prompt_cache_step * 4
+    cached = 0
+    if len(prompt) >= prompt_cache_minimum * 4:
+        for end in range(step, len(prompt) + 1, step):
+            digest = hashlib.sha256(prompt[:end].encode("utf-8")).digest()
+            if digest in prompt_prefixes:
+                cached = end // 4
+            else:
+                prompt_prefixes[digest] = True
+    while len(prompt_prefixes) > prompt_cache_size:
+        del prompt_prefixes[next(iter(prompt_prefixes))]
+    return cached if cached >= prompt_cache_minimum else 0
+
+
+def throttle(prompt_tokens):
+    """Seconds to tell the caller to wait, or ``None`` if the call fits the quota."""
+    wait = 0
+    if request_bucket:
+        wait = max(wait, request_bucket.delay(1))
+    if token_bucket:
+        wait = max(wait, token_bucket.delay(prompt_tokens))
+    if wait > 0:
+        return wait
+    if request_bucket:
+        request_bucket.consume(1)
+    if token_bucket:
+        token_bucket.consume(prompt_tokens)
+    return None
+
+
+def rate_limited(retry_after):
+    counters["throttled"] += 1
+    return JSONResponse(
+        {"error": {"code": "429", "message": "Requests to the mock deployment have exceeded the rate limit."}},
+        status_code=429,
+        headers={"retry-after-ms": str(int(retry_after * 1000)), "retry-after": str(max(int(retry_after), 1))},
+    )
+
+
+@app.post("/openai/deployments/{deployment}/chat/completions")
+async def chat_completions(deployment: str, request: Request):
+    body = await request.json()
+    counters["calls"] += 1
+    messages = body["messages"]
+    prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+
+    if random.random() < throttle_rate:
+        return rate_limited(random.uniform(0.5, 2))
+    retry_after = throttle(prompt_tokens)
+    if retry_after is not None:
+        return rate_limited(retry_after)
+
+    text = source_text(messages)
+    reply = {language: f"[{language}] {text}" for language in requested_languages(body)}
+    content = json.dumps(reply, ensure_ascii=False)
+    if random.random() < malformed_rate:
+        counters["malformed"] += 1
+        # Prose around a truncated object, as models sometimes produce
+        content = "Here is the translation:\n" + content[:max(len(content) // 2, 1)]
+    completion_tokens = estimate_tokens(content)
+    cached_tokens = cached_prefix_tokens(messages)
+    counters["prompt_tokens"] += prompt_tokens
+    counters["cached_tokens"] += cached_tokens
+    counters["completion_tokens"] += completion_tokens
+    if token_bucket:
+        token_bucket.consume(completion_tokens)
+
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": cached_tokens},
+    }
+    await asyncio.sleep(
+        random.lognormvariate(0, latency_sigma) * latency_median
+        + (prompt_tokens - cached_tokens) * seconds_per_prompt_token
+    )
+
+    if body.get("stream"):
+        counters["streamed"] += 1
+
+        async def chunks():
+            step = 16
+            for start in range(0, len(content), step):
+                piece = content[start:start + step]
+                await asyncio.sleep(estimate_tokens(piece) * seconds_per_token)
+                chunk = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": deployment,
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            if (body.get("stream_options") or {}).get("include_usage"):
+                # Like Azure, usage comes in a last chunk without choices
+                chunk = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": deployment,
+                    "choices": [], "usage": usage,
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    await asyncio.sleep(completion_tokens * seconds_per_token)
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": deployment,
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": usage,
+    }
+
+
+@app.get("/stats")
+async def stats():
+    return counters
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv('MOCK_PORT', '9000')))
@@ -0,0 +1,67 @@
+import json
+import re
+
+FENCE_RE = re.compile(r"```(?:json|JSON)?")
+DECODER = json.JSONDecoder(strict=False)
+
+
+def string_values(candidate, languages):
+    if not isinstance(candidate, dict):
+        return {}
+    return {language: candidate[language] for language in languages if isinstance(candidate.get(language), str)}
+
+
+def extract_translations(content, languages):
+    """Recover the translations for ``languages`` from a model reply.
+
+    Tries, in order: the whole reply as JSON once code fences are removed;
+    the first JSON object embedded in surrounding prose; and finally each
+    language's string value on its own, which survives trailing commas,
+    truncated objects and other damage elsewhere in the reply. Raw control
+    characters inside strings are accepted throughout.
+
+    Returns the languages that could be recovered; missing ones are left out.
+    """
+    cleaned = FENCE_RE.sub("", content or "").strip()
+
+    try:
+        translations = string_values(DECODER.decode(cleaned), languages)
+    except ValueError:
+        translations = {}
+    if len(translations) == len(languages):
+        return translations
+
+    for match in re.finditer(r"\{", cleaned):
+        try:
+            candidate, _ = DECODER.raw_decode(cleaned, match.start())
+        except ValueError:
+            continue
+        translations = {**string_values(candidate, languages), **translations}
+        break
+    if len(translations) == len(languages):
+        return translations
+
+    for language in languages:
+        if language in translations:
+            continue
+        match = re.search(r'"%s"\s*:\s*"((?:[^"\\]|\\.)*)"' % re.escape(language), cleaned, re.DOTALL)
+        if match:
+            try:
+                translations[language] = DECODER.decode('"%s"' % match.group(1))
+            except ValueError:
+                continue
+    return translations
+
+
+def response_schema(languages):
+    """JSON schema for a reply holding one string per language, for structured outputs."""
+    return {
+        "name": "translations",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {language: {"type": "string"} for language in languages},
+            "required": list(languages),
+            "additionalProperties": False,
+        },
+    }
@@ -0,0 +1,102 @@
+import functools
+import hashlib
+
+# Shared by every request, whatever the target language, and sent first so
+# Azure OpenAI can serve it from its prompt cache. Anything that varies per
+# request must go after it.
+STATIC_PREFIX = '''You are a helpful assistant whose role is to translate English text.
+
+The text to translate is the user's message. It may contain HTML markup: translate only the human-readable text and keep every tag, attribute and entity exactly as it is.
+
+Reply with only a valid JSON object, without code fences or explanations. It has one key per target language, spelled exactly as given below, and each value is the complete translation into that language as a single string.
+'''
+
+GLOSSARY_SECTION = '''
+Always follow this glossary:
+{glossary}
+'''
+
+TRANSLATE_TEMPLATE = '''
+Target language: {language}
+
+Reply like this:
+{{
+    "{language}": "translation"
+}}
+'''
+
+PACKED_TRANSLATE_TEMPLATE = '''
+Target languages: {languages}
+
+Reply like this:
+{{
+{keys}
+}}
+'''
+
+REPAIR_TEMPLATE = '''Your previous reply could not be read as the requested JSON. Reply again with only a valid JSON object like this, and nothing else:
+{{
+    "{language}": "translation"
+}}
+'''
+
+
+def template_version(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+
+class PromptRegistry:
+    """System prompts for every request, built once and reused.
+
+    Each prompt is the static prefix (instructions, reply format and the
+    optional glossary) followed by the few lines naming the target
+    languages, so all languages share the longest possible prefix. Azure
+    only caches prompts of 1024 tokens or more, which a glossary usually
+    reaches. Every template is versioned by its content; ``version``
+    covers them all and keys the translation memory.
+    """
+
+    def __init__(self, languages, glossary=None):
+        self.prefix = STATIC_PREFIX
+        if glossary:
+            self.prefix += GLOSSARY_SECTION.format(glossary=glossary.strip())
+        self.versions = {
+            "prefix": template_version(self.prefix),
+            "translate": template_version(TRANSLATE_TEMPLATE),
+            "packed": template_version(PACKED_TRANSLATE_TEMPLATE),
+            "repair": template_version(REPAIR_TEMPLATE),
+        }
+        self.version = template_version("".join(self.versions.values()))
+        self._translate = {language: self.compile_translate(language) for language in languages}
+        self.usage = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0}
+
+    def compile_translate(self, language):
+        return self.prefix + TRANSLATE_TEMPLATE.format(language=language)
+
+    def translate(self, language):
+        prompt = self._translate.get(language)
+        return prompt if prompt is not None else self.compile_translate(language)
+
+    @functools.lru_cache(maxsize=1024)
+    def packed(self, languages):
+        """Prompt for several languages at once; ``languages`` is a tuple."""
+        keys = ",\n".join(f'    "{language}": "translation"' for language in languages)
+        return self.prefix + PACKED_TRANSLATE_TEMPLATE.format(languages=", ".join(languages), keys=keys)
+
+    def repair(self, language):
+        return REPAIR_TEMPLATE.format(language=language)
+
+    def record_usage(self, prompt_tokens, cached_tokens):
+        self.usage["calls"] += 1
+        self.usage["prompt_tokens"] += prompt_tokens
+        self.usage["cached_tokens"] += cached_tokens
+
+    def stats(self):
+        prompt_tokens = self.usage["prompt_tokens"]
+        return {
+            "version": self.version,
+            "templates": self.versions,
+            "prefix_characters": len(self.prefix),
+            **self.usage,
+            "cached_ratio": self.usage["cached_tokens"] / prompt_tokens if prompt_tokens else 0.0,
+        }
@@ -0,0 +1,165 @@
+import asyncio
+import email.utils
+import random
+import time
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``per_minute`` units per minute.
+
+    The bucket holds ``burst_seconds`` worth of refill so a full minute of
+    quota is never released at once. A request larger than the bucket waits
+    for a full bucket and then drives it negative, which later requests repay.
+    """
+
+    def __init__(self, per_minute, burst_seconds=10):
+        self.rate = per_minute / 60
+        self.capacity = max(self.rate * burst_seconds, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount):
+        """Seconds until ``amount`` units can be taken."""
+        self.refill()
+        needed = min(amount, self.capacity) - self.tokens
+        return max(needed / self.rate, 0)
+
+    def consume(self, amount):
+        self.refill()
+        self.tokens -= amount
+
+    def remaining(self):
+        self.refill()
+        return max(self.tokens, 0) / self.capacity
+
+
+class RateLimiter:
+    """Client-side limiter for a requests-per-minute and a tokens-per-minute quota.
+
+    Either quota may be ``None`` to leave it unlimited. ``pause`` blocks all
+    callers until a server-provided Retry-After has elapsed.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def delay(self, tokens):
+        """Seconds until a call estimated at ``tokens`` could be let through."""
+        wait = self.blocked_until - time.monotonic()
+        if self.requests:
+            wait = max(wait, self.requests.delay(1))
+        if self.tokens:
+            wait = max(wait, self.tokens.delay(tokens))
+        return max(wait, 0)
+
+    async def acquire(self, tokens):
+        # One waiter at a time keeps the buckets first come, first served
+        async with self._lock:
+            while (wait := self.delay(tokens)) > 0:
+                await asyncio.sleep(wait)
+            if self.requests:
+                self.requests.consume(1)
+            if self.tokens:
+                self.tokens.consume(tokens)
+
+    def settle(self, estimated_tokens, actual_tokens):
+        """Correct the token bucket once the real usage of a call is known."""
+        if self.tokens and actual_tokens is not None:
+            self.tokens.consume(actual_tokens - estimated_tokens)
+
+    def pause(self, seconds):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def remaining(self):
+        """Fraction of the tighter quota currently available, between 0 and 1."""
+        buckets = [bucket for bucket in (self.requests, self.tokens) if bucket]
+        if not buckets:
+            return 1.0
+        if self.blocked_until > time.monotonic():
+            return 0.0
+        return min(bucket.remaining() for bucket in buckets)
+
+
+class AdaptiveConcurrency:
+    """Concurrency limit that halves on throttling and grows back on success (AIMD).
+
+    Throttles arriving within ``cooldown`` seconds of the last decrease are
+    treated as the same congestion event, so a burst of 429s halves once.
+    """
+
+    def __init__(self, initial, minimum=1, maximum=None, cooldown=1.0):
+        self.minimum = minimum
+        self.cooldown = cooldown
+        self.last_decrease = 0.0
+        self.maximum = maximum or initial
+        self.limit = float(min(max(initial, minimum), self.maximum))
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.release()
+
+    def record_success(self):
+        # Grows by roughly one slot per limit's worth of successful calls
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def record_throttle(self):
+        now = time.monotonic()
+        if now - self.last_decrease < self.cooldown:
+            return
+        self.last_decrease = now
+        self.limit = max(self.minimum, self.limit / 2)
+
+
+def retry_after_seconds(headers):
+    """Parse the retry delay from Azure OpenAI response headers, if any."""
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0)
+
+
+def backoff_delay(attempt, base, cap, retry_after=None):
+    """Exponential backoff with full jitter, never shorter than Retry-After."""
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after + random.uniform(0, base))
+    return delay
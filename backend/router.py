@@ -0,0 +1,125 @@
+import time
+
+
+class Deployment:
+    """One Azure OpenAI deployment completions can be routed to.
+
+    ``model`` names the underlying model and is what translations are cached
+    under; ``deployment`` is the Azure deployment name sent with each call.
+    ``languages`` and the text token bounds restrict which requests it
+    serves (``None`` serves everything). Lower ``priority`` is preferred.
+    """
+
+    def __init__(self, name, client, model, deployment, rate_limiter, concurrency, response_format,
+                 languages=None, min_text_tokens=0, max_text_tokens=None, priority=0):
+        self.name = name
+        self.client = client
+        self.model = model
+        self.deployment = deployment
+        self.rate_limiter = rate_limiter
+        self.concurrency = concurrency
+        self.response_format = response_format
+        self.languages = set(languages) if languages else None
+        self.min_text_tokens = min_text_tokens
+        self.max_text_tokens = max_text_tokens
+        self.priority = priority
+        self.latency = None
+        self.unhealthy_until = 0.0
+        self.calls = 0
+        self.failures = 0
+
+    def serves(self, languages, text_tokens):
+        if self.languages is not None and not self.languages.issuperset(languages):
+            return False
+        if text_tokens < self.min_text_tokens:
+            return False
+        return self.max_text_tokens is None or text_tokens <= self.max_text_tokens
+
+    def healthy(self):
+        return time.monotonic() >= self.unhealthy_until
+
+    def saturated(self, estimated_tokens):
+        """Whether a call would have to wait here for quota or a free slot."""
+        return (
+            self.rate_limiter.delay(estimated_tokens) > 0
+            or self.concurrency.in_flight >= int(self.concurrency.limit)
+        )
+
+    def expected_seconds(self, estimated_tokens, default_latency):
+        """Rough time for one more call here: quota wait plus queueing behind calls in flight."""
+        latency = self.latency if self.latency is not None else default_latency
+        queued = (self.concurrency.in_flight + 1) / max(int(self.concurrency.limit), 1)
+        return self.rate_limiter.delay(estimated_tokens) + latency * queued
+
+    def record_latency(self, seconds, smoothing):
+        self.calls += 1
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += smoothing * (seconds - self.latency)
+
+    def record_failure(self, cooldown):
+        """Route around this deployment for ``cooldown`` seconds unless nothing else can serve."""
+        self.failures += 1
+        self.unhealthy_until = max(self.unhealthy_until, time.monotonic() + cooldown)
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "model": self.model,
+            "deployment": self.deployment,
+            "priority": self.priority,
+            "healthy": self.healthy(),
+            "in_flight": self.concurrency.in_flight,
+            "concurrency_limit": int(self.concurrency.limit),
+            "quota_remaining": round(self.rate_limiter.remaining(), 3),
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+            "calls": self.calls,
+            "failures": self.failures,
+            "response_format": self.response_format,
+        }
+
+
+class Router:
+    """Picks a deployment for each completion.
+
+    Requests go to the deployments whose language and length rules match
+    them, or to every deployment when none match. Healthy deployments with
+    quota and a free slot come first, then lower priority, then the one
+    expected to finish soonest given its quota, calls in flight and
+    smoothed latency. A deployment that fails or is exhausted therefore
+    spills its traffic onto the others until it recovers.
+    """
+
+    def __init__(self, deployments, smoothing=0.2, default_latency=1.0):
+        if not deployments:
+            raise ValueError("At least one deployment is required")
+        self.deployments = deployments
+        self.smoothing = smoothing
+        self.default_latency = default_latency
+
+    def eligible(self, languages, text_tokens):
+        matching = [deployment for deployment in self.deployments if deployment.serves(languages, text_tokens)]
+        return matching or self.deployments
+
+    def models(self, languages, text_tokens):
+        """Models that may serve a request, most preferred first, for cache lookups."""
+        ranked = sorted(self.eligible(languages, text_tokens), key=lambda deployment: deployment.priority)
+        return list(dict.fromkeys(deployment.model for deployment in ranked))
+
+    def choose(self, languages, text_tokens, estimated_tokens):
+        return min(
+            self.eligible(languages, text_tokens),
+            key=lambda deployment: (
+                not deployment.healthy(),
+                deployment.saturated(estimated_tokens),
+                deployment.priority,
+                deployment.expected_seconds(estimated_tokens, self.default_latency),
+            ),
+        )
+
+    def record_latency(self, deployment, seconds):
+        deployment.record_latency(seconds, self.smoothing)
+
+    def stats(self):
+        return [deployment.stats() for deployment in self.deployments]
@@ -0,0 +1,177 @@
+import asyncio
+import contextvars
+from collections import deque
+
+import metrics
+
+# Lane of the request being served, inherited by the tasks it starts
+current_lane = contextvars.ContextVar('current_lane', default='interactive')
+
+
+class Lane:
+    """A class of traffic with its share of a deployment's capacity.
+
+    ``weight`` sets its share of dispatches, measured in estimated tokens,
+    while other lanes are waiting too. ``max_share`` caps the fraction of
+    the concurrency limit it may hold at once, leaving the rest free for
+    other lanes even when it has plenty queued.
+    """
+
+    def __init__(self, name, weight=1.0, max_share=1.0):
+        self.name = name
+        self.weight = weight
+        self.max_share = max_share
+
+
+class DeploymentQueue:
+    """Per-lane waiting lines in front of one deployment's concurrency slots and quota.
+
+    A single dispatcher hands out capacity in start-time fair queuing order:
+    each lane advances its virtual time by ``tokens / weight`` per dispatch
+    and the waiting lane furthest behind goes next. An idle lane rejoins at
+    the current virtual time instead of banking credit.
+    """
+
+    def __init__(self, name, lanes, concurrency, rate_limiter):
+        self.name = name
+        self.lanes = lanes
+        self.concurrency = concurrency
+        self.rate_limiter = rate_limiter
+        self.waiting = {lane: deque() for lane in lanes}
+        self.in_flight = {lane: 0 for lane in lanes}
+        self.virtual_times = {lane: 0.0 for lane in lanes}
+        self.clock = 0.0
+        self._condition = asyncio.Condition()
+        self._dispatcher = None
+
+    def lane_limit(self, lane):
+        return max(int(self.lanes[lane].max_share * int(self.concurrency.limit)), 1)
+
+    def ready_lanes(self):
+        return [
+            lane for lane, waiters in self.waiting.items()
+            if waiters and self.in_flight[lane] < self.lane_limit(lane)
+        ]
+
+    def next_lane(self):
+        lane = min(self.ready_lanes(), key=lambda lane: max(self.virtual_times[lane], self.clock))
+        start = max(self.virtual_times[lane], self.clock)
+        self.clock = start
+        self.virtual_times[lane] = start + self.waiting[lane][0][1] / self.lanes[lane].weight
+        return lane
+
+    async def acquire(self, lane, tokens):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self.dispatch())
+        future = asyncio.get_running_loop().create_future()
+        async with self._condition:
+            self.waiting[lane].append((future, tokens))
+            metrics.lane_queue_depth.labels(lane).inc()
+            self._condition.notify_all()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Cancelled just after being handed a slot: give it back
+                await self.release(lane)
+            raise
+
+    async def release(self, lane):
+        await self.concurrency.release()
+        async with self._condition:
+            self.in_flight[lane] -= 1
+            metrics.lane_in_flight.labels(lane).dec()
+            self._condition.notify_all()
+
+    async def dispatch(self):
+        while True:
+            async with self._condition:
+                await self._condition.wait_for(self.ready_lanes)
+                lane = self.next_lane()
+                future, tokens = self.waiting[lane].popleft()
+                metrics.lane_queue_depth.labels(lane).dec()
+            if future.done():
+                # The caller gave up while queued
+                continue
+            holding = False
+            try:
+                await self.concurrency.acquire()
+                holding = True
+                await self.rate_limiter.acquire(tokens)
+            except Exception as e:
+                # Fail this caller only; the dispatcher keeps serving the others
+                if holding:
+                    await self.concurrency.release()
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            if future.done():
+                await self.concurrency.release()
+                continue
+            async with self._condition:
+                self.in_flight[lane] += 1
+                metrics.lane_in_flight.labels(lane).inc()
+            future.set_result(None)
+
+    def close(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+
+    def stats(self):
+        return {
+            lane: {
+                "queued": len(self.waiting[lane]),
+                "in_flight": self.in_flight[lane],
+                "limit": self.lane_limit(lane),
+            }
+            for lane in self.lanes
+        }
+
+
+class LaneScheduler:
+    """Shares every deployment's concurrency and token budget between priority lanes.
+
+    Callers tag their lane through ``current_lane``; completions then wait
+    in that lane's line for the deployment the router picked.
+    """
+
+    def __init__(self, lanes):
+        self.lanes = {lane.name: lane for lane in lanes}
+        self.queues = {}
+
+    def queue(self, deployment):
+        queue = self.queues.get(deployment.name)
+        if queue is None:
+            queue = DeploymentQueue(deployment.name, self.lanes, deployment.concurrency, deployment.rate_limiter)
+            self.queues[deployment.name] = queue
+        return queue
+
+    async def acquire(self, deployment, lane, tokens):
+        """Wait for a concurrency slot and quota on ``deployment``; release with ``release``."""
+        await self.queue(deployment).acquire(lane, tokens)
+
+    async def release(self, deployment, lane):
+        await self.queue(deployment).release(lane)
+
+    def close(self):
+        for queue in self.queues.values():
+            queue.close()
+
+    def stats(self):
+        return {
+            "lanes": {
+                name: {"weight": lane.weight, "max_share": lane.max_share}
+                for name, lane in self.lanes.items()
+            },
+            "deployments": {name: queue.stats() for name, queue in self.queues.items()},
+        }
+
+
+def parse_lane_settings(value):
+    """Parse ``"interactive=4,bulk=1"`` into ``{"interactive": 4.0, "bulk": 1.0}``."""
+    settings = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            name, setting = item.split("=", 1)
+            settings[name.strip()] = float(setting)
+    return settings
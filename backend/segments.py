@@ -0,0 +1,98 @@
+import html
+import re
+
+# Tags that start or end a block of text; everything else (bold, links, line
+# breaks...) stays inside the segment so the model can move it with the words.
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "body", "dd", "div", "dl", "dt",
+    "figcaption", "figure", "footer", "h1", "h2", "h3", "h4", "h5", "h6", "head",
+    "header", "hr", "html", "li", "main", "nav", "ol", "p", "pre", "section",
+    "table", "tbody", "td", "tfoot", "th", "thead", "title", "tr", "ul",
+}
+
+TAG_RE = re.compile(r"(<[^>]*>)")
+TAG_NAME_RE = re.compile(r"<\s*/?\s*([a-zA-Z][a-zA-Z0-9]*)")
+LETTER_RE = re.compile(r"[^\W\d_]")
+
+
+def is_block_tag(token):
+    match = TAG_NAME_RE.match(token)
+    return bool(match) and match.group(1).lower() in BLOCK_TAGS
+
+
+def is_translatable(fragment):
+    """True if the fragment holds any letters once markup and entities are removed."""
+    return bool(LETTER_RE.search(html.unescape(TAG_RE.sub("", fragment))))
+
+
+def split_segments(text):
+    """Split HTML into block-level segments.
+
+    Returns a list of ``(fragment, translatable)`` pairs whose fragments
+    concatenate back to the original text. Translatable fragments carry the
+    inner content of one block (text plus inline markup) with surrounding
+    whitespace left outside, so they can be translated and cached on their own.
+    """
+    parts = []
+    buffer = []
+
+    def flush():
+        fragment = "".join(buffer)
+        buffer.clear()
+        if not fragment:
+            return
+        if not is_translatable(fragment):
+            parts.append((fragment, False))
+            return
+        stripped = fragment.strip()
+        start = fragment.index(stripped)
+        if start:
+            parts.append((fragment[:start], False))
+        parts.append((stripped, True))
+        if start + len(stripped) < len(fragment):
+            parts.append((fragment[start + len(stripped):], False))
+
+    for token in TAG_RE.split(text):
+        if not token:
+            continue
+        if token.startswith("<") and is_block_tag(token):
+            flush()
+            parts.append((token, False))
+        else:
+            buffer.append(token)
+    flush()
+    return parts
+
+
+def join_segments(parts, translations):
+    """Reassemble a document, replacing translatable fragments with their translation."""
+    return "".join(translations[fragment] if translatable else fragment for fragment, translatable in parts)
+
+
+def unique_segments(parts):
+    return list(dict.fromkeys(fragment for fragment, translatable in parts if translatable))
+
+
+def align_segments(original, translation):
+    """Pair the segments of a document with those of its translation.
+
+    Returns ``(source, target)`` pairs, or None when the two do not share
+    the same block structure and so cannot be matched segment by segment.
+    """
+    original_parts = split_segments(original)
+    translated_parts = split_segments(translation)
+
+    def skeleton(parts):
+        # Markup between segments, with None standing for each segment
+        return [
+            None if translatable else fragment.strip()
+            for fragment, translatable in parts
+            if translatable or fragment.strip()
+        ]
+
+    if skeleton(original_parts) != skeleton(translated_parts):
+        return None
+    return list(zip(
+        (fragment for fragment, translatable in original_parts if translatable),
+        (fragment for fragment, translatable in translated_parts if translatable),
+    ))
@@ -0,0 +1,81 @@
+import json
+import re
+
+ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+class JsonStringExtractor:
+    """Incrementally decode the string value of one key from a streamed JSON reply.
+
+    Feed the reply as it arrives; ``feed`` returns the newly decoded part of
+    the value so it can be forwarded before the reply is complete.
+    """
+
+    def __init__(self, key):
+        self.opening = re.compile(r'"%s"\s*:\s*"' % re.escape(key))
+        self.buffer = ""
+        self.position = None
+        self.text = ""
+        self.finished = False
+
+    @property
+    def started(self):
+        return self.position is not None
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        if self.finished:
+            return ""
+        if self.position is None:
+            match = self.opening.search(self.buffer)
+            if not match:
+                return ""
+            self.position = match.end()
+
+        decoded = []
+        buffer = self.buffer
+        position = self.position
+        while position < len(buffer):
+            char = buffer[position]
+            if char == '"':
+                self.finished = True
+                position += 1
+                break
+            if char != '\\':
+                decoded.append(char)
+                position += 1
+                continue
+            if position + 1 >= len(buffer):
+                break
+            escape = buffer[position + 1]
+            if escape != 'u':
+                decoded.append(ESCAPES.get(escape, escape))
+                position += 2
+                continue
+            # \uXXXX, or a surrogate pair \uXXXX\uXXXX
+            length = 6
+            if position + 6 <= len(buffer) and 0xD800 <= int(buffer[position + 2:position + 6], 16) <= 0xDBFF:
+                length = 12
+            if position + length > len(buffer):
+                break
+            decoded.append(json.loads('"%s"' % buffer[position:position + length]))
+            position += length
+
+        self.position = position
+        piece = "".join(decoded)
+        self.text += piece
+        return piece
+
+
+class Replacement(str):
+    """A segment's whole translation, superseding the pieces already streamed for it."""
+
+
+# Characters str.splitlines treats as line breaks that JSON leaves unescaped;
+# clients splitting the stream that way would cut a data line in two
+LINE_BREAKS = str.maketrans({"\u0085": "\\u0085", "\u2028": "\\u2028", "\u2029": "\\u2029"})
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Events message with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False).translate(LINE_BREAKS)}\n\n"
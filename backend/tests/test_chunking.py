@@ -0,0 +1,46 @@
+import random
+
+from chunking import chunk_parts, estimate_tokens, split_into_chunks
+from segments import split_segments
+
+
+def test_short_text_is_one_chunk():
+    assert split_into_chunks("Hello world.", 10) == ["Hello world."]
+
+
+def test_chunks_prefer_paragraph_boundaries():
+    text = "First paragraph here.\n\nSecond paragraph here."
+    assert split_into_chunks(text, 7) == ["First paragraph here.\n\n", "Second paragraph here."]
+
+
+def test_chunks_fall_back_to_sentences_then_words():
+    text = "One sentence here. Another sentence follows it."
+    chunks = split_into_chunks(text, 6)
+    assert chunks == ["One sentence here. ", "Another sentence ", "follows it."]
+    assert "".join(split_into_chunks("word " * 40, 5)) == "word " * 40
+
+
+def test_chunks_never_cut_inside_inline_elements():
+    text = "Intro text. <b>bold words that stay together</b> outro."
+    for chunk in split_into_chunks(text, 3):
+        assert chunk.count("<b>") == chunk.count("</b>")
+
+
+def test_chunk_parts_keeps_leftover_separators_untranslated():
+    assert chunk_parts(split_segments("<p>aa\n\nbbb</p>"), 1) == [
+        ("<p>", False), ("aa", True), ("\n", False), ("\n", False), ("bbb", True), ("</p>", False),
+    ]
+
+
+def test_chunk_parts_round_trips_without_empty_segments():
+    rng = random.Random(0)
+    words = ["alpha", "beta", "gamma.", "delta!", "<i>x</i>", "epsilon"]
+    for _ in range(500):
+        paragraphs = [" ".join(rng.choice(words) for _ in range(rng.randint(0, 30))) for _ in range(rng.randint(1, 6))]
+        text = "<pre>" + rng.choice(["\n\n", "\n", "\n \n\n"]).join(paragraphs) + "</pre>"
+        parts = chunk_parts(split_segments(text), 10)
+        assert "".join(fragment for fragment, _ in parts) == text
+        for fragment, translatable in parts:
+            if translatable:
+                assert fragment.strip() == fragment and fragment
+                assert estimate_tokens(fragment) <= 10 or " " not in fragment
@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+from coalesce import LeaderCancelled, SingleFlight
+
+
+def test_failed_call_is_shared_and_cleared():
+    async def scenario():
+        single_flight = SingleFlight()
+        gate = asyncio.Event()
+
+        async def failing():
+            await gate.wait()
+            raise RuntimeError("upstream failed")
+
+        leader = asyncio.create_task(single_flight.do("key", failing))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(single_flight.do("key", failing))
+        await asyncio.sleep(0)
+        gate.set()
+        results = await asyncio.gather(leader, follower, return_exceptions=True)
+        return single_flight, results
+
+    single_flight, results = asyncio.run(scenario())
+    assert [str(result) for result in results] == ["upstream failed", "upstream failed"]
+    assert single_flight.stats()["in_flight"] == 0
+    assert single_flight.stats()["coalesced"] == 1
+
+
+def test_finish_with_error_wakes_followers():
+    async def scenario():
+        single_flight = SingleFlight()
+        single_flight.lead("key")
+        follower = asyncio.create_task(single_flight.wait(single_flight.join("key")))
+        await asyncio.sleep(0)
+        single_flight.finish("key", error=LeaderCancelled())
+        with pytest.raises(LeaderCancelled):
+            await asyncio.wait_for(follower, 1)
+        return single_flight
+
+    assert asyncio.run(scenario()).stats()["in_flight"] == 0
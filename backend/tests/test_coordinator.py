@@ -0,0 +1,34 @@
+import asyncio
+import sqlite3
+import time
+
+from coordinator import Coordinator, SharedRateLimiter
+
+
+def test_acquire_waits_for_another_process_off_the_event_loop(tmp_path):
+    path = str(tmp_path / "coordinator.db")
+    coordinator = Coordinator(path)
+    limiter = SharedRateLimiter(coordinator, "deployment", requests_per_minute=600)
+    # Another worker process holding the write lock
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+
+    async def scenario():
+        acquire = asyncio.create_task(limiter.acquire(10))
+        started = time.monotonic()
+        ticks = 0
+        while time.monotonic() - started < 0.5:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        assert not acquire.done()
+        other.execute("COMMIT")
+        await asyncio.wait_for(acquire, 5)
+        return ticks
+
+    try:
+        # The loop kept running while the acquire waited for the lock
+        assert asyncio.run(scenario()) > 20
+        assert coordinator.levels([limiter.requests])[0] < limiter.requests[2]
+    finally:
+        other.close()
+        coordinator.close()
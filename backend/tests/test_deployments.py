@@ -0,0 +1,11 @@
+import main
+
+
+def test_numeric_deployment_settings_may_be_strings():
+    deployment = main.build_deployment({
+        "endpoint": "http://127.0.0.1:9000", "api_key": "x", "api_version": "2024-08-01-preview",
+        "min_text_tokens": "10", "max_text_tokens": "200",
+    })
+    assert deployment.max_text_tokens == 200
+    assert deployment.serves(["French"], 50)
+    assert not deployment.serves(["French"], 500)
@@ -0,0 +1,53 @@
+import asyncio
+import sqlite3
+
+import main
+
+
+class LockedQueue:
+    """A job queue whose database is locked for the first two claims."""
+
+    def __init__(self):
+        self.claims = 0
+        self.completed = {}
+
+    def claim(self, lease):
+        self.claims += 1
+        if self.claims <= 2:
+            raise sqlite3.OperationalError("database is locked")
+        if self.claims == 3:
+            return "job", "project", "Hello", 1, {1: "French"}
+        return None
+
+    def recover(self):
+        pass
+
+    def complete(self, item_id, translation):
+        self.completed[item_id] = translation
+
+    def unsaved_results(self):
+        return []
+
+
+def test_job_worker_survives_a_locked_database(monkeypatch):
+    queue = LockedQueue()
+
+    async def translate_languages(text, languages, pack_size):
+        return {language: f"[{language}] {text}" for language in languages}
+
+    monkeypatch.setattr(main, "job_queue", queue)
+    monkeypatch.setattr(main, "translate_languages", translate_languages)
+    monkeypatch.setattr(main, "job_poll_interval", 0.01)
+    monkeypatch.setattr(main, "job_retry_delay", 0.01)
+
+    async def scenario():
+        monkeypatch.setattr(main, "job_available", asyncio.Event())
+        monkeypatch.setattr(main, "job_save_lock", asyncio.Lock())
+        worker = asyncio.create_task(main.run_job_worker())
+        while not queue.completed:
+            await asyncio.sleep(0.01)
+            assert not worker.done()
+        worker.cancel()
+
+    asyncio.run(asyncio.wait_for(scenario(), 5))
+    assert queue.completed == {1: "[French] Hello"}
@@ -0,0 +1,15 @@
+from fastapi.testclient import TestClient
+
+import main
+
+client = TestClient(main.app)
+
+
+def test_unknown_lane_does_not_fail_health_checks():
+    assert client.get("/healthz", params={"lane": "foo"}).status_code == 200
+
+
+def test_unknown_lane_is_rejected_for_translations():
+    response = client.post("/translate/French/", params={"lane": "foo"}, json={"text": "Hello"})
+    assert response.status_code == 400
+    assert "Lane 'foo' not found" in response.json()["detail"]
@@ -0,0 +1,13 @@
+import asyncio
+from types import SimpleNamespace
+
+import main
+
+
+def test_deployment_cooling_down_keeps_the_worker_ready(monkeypatch):
+    deployment = SimpleNamespace(name="gpt-4o", healthy=lambda: False)
+    monkeypatch.setattr(main, "ready", True)
+    monkeypatch.setattr(main, "coordinator", None)
+    monkeypatch.setattr(main, "router", SimpleNamespace(deployments=[deployment]))
+
+    assert asyncio.run(main.readyz()) == {"status": "ready", "deployments": [], "cooling_down": ["gpt-4o"]}
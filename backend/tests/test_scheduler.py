@@ -0,0 +1,33 @@
+import asyncio
+
+from ratelimit import AdaptiveConcurrency
+from scheduler import DeploymentQueue, Lane
+
+
+class FlakyRateLimiter:
+    """Raises on the first acquire, like a shared limiter whose database is locked."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def acquire(self, tokens):
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError("database is locked")
+
+
+def test_dispatch_error_fails_one_caller_and_frees_its_slot():
+    async def scenario():
+        concurrency = AdaptiveConcurrency(1, minimum=1, maximum=1)
+        queue = DeploymentQueue("test", {"interactive": Lane("interactive")}, concurrency, FlakyRateLimiter())
+        failed = await asyncio.gather(asyncio.wait_for(queue.acquire("interactive", 10), 1), return_exceptions=True)
+        await asyncio.wait_for(queue.acquire("interactive", 10), 1)
+        in_flight = queue.stats()["interactive"]["in_flight"]
+        await queue.release("interactive")
+        await asyncio.wait_for(queue.acquire("interactive", 10), 1)
+        queue.close()
+        return failed, in_flight
+
+    failed, in_flight = asyncio.run(scenario())
+    assert isinstance(failed[0], RuntimeError)
+    assert in_flight == 1
@@ -0,0 +1,27 @@
+from segments import join_segments, split_segments
+
+
+def test_split_segments_separates_blocks_from_their_text():
+    parts = split_segments("<h1>Title</h1>\n<p>Hello <b>world</b>.</p>")
+    assert parts == [
+        ("<h1>", False), ("Title", True), ("</h1>", False), ("\n", False),
+        ("<p>", False), ("Hello <b>world</b>.", True), ("</p>", False),
+    ]
+
+
+def test_split_segments_leaves_whitespace_and_wordless_text_untranslated():
+    parts = split_segments("<p>  Hello  </p><p>123 &nbsp;</p>")
+    assert parts == [
+        ("<p>", False), ("  ", False), ("Hello", True), ("  ", False), ("</p>", False),
+        ("<p>", False), ("123 &nbsp;", False), ("</p>", False),
+    ]
+
+
+def test_split_segments_round_trips():
+    text = "<div>\n  <p>One</p>\n  <ul><li>Two <a href='#'>links</a></li></ul>\n</div>"
+    assert "".join(fragment for fragment, _ in split_segments(text)) == text
+
+
+def test_join_segments_replaces_translatable_fragments():
+    parts = split_segments("<p>Hello</p><p>Hello</p><p>Bye</p>")
+    assert join_segments(parts, {"Hello": "Bonjour", "Bye": "Salut"}) == "<p>Bonjour</p><p>Bonjour</p><p>Salut</p>"
@@ -0,0 +1,12 @@
+import json
+
+from streaming import sse_event
+
+
+def test_sse_event_keeps_unicode_line_separators_on_the_data_line():
+    text = "a b c\u0085dé"
+    lines = sse_event("delta", {"text": text}).splitlines()
+    assert lines[0] == "event: delta"
+    assert json.loads(lines[1][len("data:"):]) == {"text": text}
+    # Other non-ASCII text is sent as is
+    assert "é" in lines[1]
@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+
+import main
+from coalesce import SingleFlight
+
+
+class UpstreamError(Exception):
+    pass
+
+
+async def no_cached_translation(segment, language):
+    return None
+
+
+@pytest.fixture
+def packed(monkeypatch):
+    monkeypatch.setattr(main, "single_flight", SingleFlight())
+    monkeypatch.setattr(main, "cached_translation", no_cached_translation)
+    monkeypatch.setattr(main, "translation_key", lambda segment, language: f"{segment}:{language}")
+
+
+def test_failed_packed_completion_settles_led_keys(packed, monkeypatch):
+    async def failing(segment, languages):
+        raise UpstreamError("throttled")
+
+    monkeypatch.setattr(main, "request_packed_translation", failing)
+
+    async def scenario():
+        results = await main.translate_packed("Hello", ["French", "German"])
+        # A later request for the same segment must not find a stale flight
+        assert main.single_flight.join("Hello:French") is None
+        return results
+
+    results = asyncio.run(scenario())
+    assert set(results) == {"French", "German"}
+    assert all(isinstance(result, UpstreamError) for result in results.values())
+    assert main.single_flight.stats()["in_flight"] == 0
+
+
+def test_packed_failure_reaches_joined_requests(packed, monkeypatch):
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def failing(segment, languages):
+            await gate.wait()
+            raise UpstreamError("connection reset")
+
+        monkeypatch.setattr(main, "request_packed_translation", failing)
+        leader = asyncio.create_task(main.translate_packed("Hello", ["French", "German"]))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(main.translate_packed("Hello", ["French", "German"]))
+        await asyncio.sleep(0)
+        gate.set()
+        return await asyncio.wait_for(asyncio.gather(leader, follower), 1)
+
+    for results in asyncio.run(scenario()):
+        assert all(isinstance(result, UpstreamError) for result in results.values())
+
+
+def test_failed_packed_completion_retries_each_language(monkeypatch):
+    async def failing(messages, text, languages):
+        raise UpstreamError("bad request")
+
+    async def single(segment, language):
+        if language == "German":
+            raise UpstreamError("still failing")
+        return f"{language} translation"
+
+    monkeypatch.setattr(main, "complete", failing)
+    monkeypatch.setattr(main, "request_translation", single)
+
+    results = asyncio.run(main.request_packed_translation("Hello", ["French", "German"]))
+    assert results["French"] == "French translation"
+    assert isinstance(results["German"], UpstreamError)
+
+
+class Coordinator:
+    """Claims shared with another worker process, which holds ``taken``."""
+
+    def __init__(self, taken=()):
+        self.taken = set(taken)
+        self.claims = []
+        self.released = []
+
+    def claim(self, key, ttl):
+        if key in self.taken:
+            return False
+        self.claims.append(key)
+        return True
+
+    def claimed(self, key):
+        # The other worker finishes right away
+        self.taken.discard(key)
+        return False
+
+    def release(self, key):
+        self.released.append(key)
+
+
+def test_packed_languages_are_claimed_across_workers(packed, monkeypatch):
+    coordinator = Coordinator()
+    requested = []
+
+    async def packed_translation(segment, languages):
+        requested.append(languages)
+        return {language: f"{language} translation" for language in languages}
+
+    monkeypatch.setattr(main, "coordinator", coordinator)
+    monkeypatch.setattr(main, "request_packed_translation", packed_translation)
+
+    results = asyncio.run(main.translate_packed("Hello", ["German", "French"]))
+    assert results == {"German": "German translation", "French": "French translation"}
+    assert coordinator.claims == ["Hello:French", "Hello:German"]
+    assert sorted(coordinator.released) == coordinator.claims
+
+
+def test_packed_language_finished_by_another_worker_is_not_requested(packed, monkeypatch):
+    coordinator = Coordinator(taken={"Hello:German"})
+    requested = []
+
+    async def packed_translation(segment, languages):
+        requested.append(languages)
+        return {language: f"{language} translation" for language in languages}
+
+    async def cached_translation(segment, language):
+        # Written by the other worker before it released its claim
+        return "Hallo" if language == "German" and "Hello:German" not in coordinator.taken else None
+
+    monkeypatch.setattr(main, "coordinator", coordinator)
+    monkeypatch.setattr(main, "cached_translation", cached_translation)
+    monkeypatch.setattr(main, "request_packed_translation", packed_translation)
+
+    results = asyncio.run(main.translate_packed("Hello", ["French", "German"]))
+    assert results == {"French": "French translation", "German": "Hallo"}
+    assert requested == [["French"]]
+    assert coordinator.released == ["Hello:French"]
+
+
+def test_claim_won_after_another_worker_finished_returns_its_translation(monkeypatch):
+    coordinator = Coordinator()
+
+    async def cached_translation(segment, language):
+        return "Bonjour"
+
+    monkeypatch.setattr(main, "coordinator", coordinator)
+    monkeypatch.setattr(main, "cached_translation", cached_translation)
+
+    assert asyncio.run(main.claim_across_workers("Hello:French", "Hello", "French")) == "Bonjour"
+    assert coordinator.released == coordinator.claims == ["Hello:French"]
@@ -0,0 +1,85 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from coalesce import SingleFlight
+from streaming import Replacement
+
+
+def chunk(content):
+    return SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+class Stream:
+    def __init__(self, contents):
+        self.contents = contents
+
+    async def __aiter__(self):
+        for content in self.contents:
+            yield chunk(content)
+
+
+class Scheduler:
+    async def release(self, deployment, lane):
+        pass
+
+
+async def no_cached_translation(segment, language):
+    return None
+
+
+@pytest.fixture
+def truncated(monkeypatch):
+    """A streamed reply that breaks off after "Bonjour le"."""
+    async def create_completion(messages, text, languages, **kwargs):
+        return Stream(['{"French": "Bonjour', ' le']), SimpleNamespace(model="gpt-4o")
+
+    monkeypatch.setattr(main, "create_completion", create_completion)
+    monkeypatch.setattr(main, "scheduler", Scheduler())
+    monkeypatch.setattr(main, "single_flight", SingleFlight())
+    monkeypatch.setattr(main, "coordinator", None)
+    monkeypatch.setattr(main, "cached_translation", no_cached_translation)
+    monkeypatch.setattr(main, "translation_key", lambda segment, language: f"{segment}:{language}")
+
+
+def pieces(segment, language):
+    async def collect():
+        return [piece async for piece in main.translate_uncached_stream(segment, language)]
+    return asyncio.run(collect())
+
+
+def events(response):
+    async def collect():
+        return [part async for part in response.body_iterator]
+    messages = []
+    for message in asyncio.run(collect()):
+        event, data = message.strip().split("\n")
+        messages.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return messages
+
+
+def test_truncated_stream_sends_the_rest_of_the_retried_translation(truncated, monkeypatch):
+    async def request_translation(segment, language):
+        return "Bonjour le monde"
+
+    monkeypatch.setattr(main, "request_translation", request_translation)
+    assert "".join(pieces("Hello world", "French")) == "Bonjour le monde"
+
+
+def test_truncated_stream_replaces_a_differing_retry(truncated, monkeypatch):
+    async def request_translation(segment, language):
+        return "Salut le monde"
+
+    monkeypatch.setattr(main, "request_translation", request_translation)
+    result = pieces("Hello world", "French")
+    assert result[:2] == ["Bonjour", " le"]
+    assert isinstance(result[-1], Replacement) and result[-1] == "Salut le monde"
+
+    response = asyncio.run(main.translate_text_stream("French", main.TranslationRequest(text="<p>Hello world</p>")))
+    messages = events(response)
+    replace = [data for event, data in messages if event == "replace"]
+    assert replace and replace[0]["text"].endswith("Salut le monde") and "Bonjour" not in replace[0]["text"]
+    assert messages[-1][0] == "done"
@@ -0,0 +1,18 @@
+import asyncio
+import sqlite3
+
+import main
+
+
+class LockedCache:
+    def set(self, *entry):
+        raise sqlite3.OperationalError("database is locked")
+
+
+def test_failed_memory_write_keeps_the_translation(monkeypatch):
+    async def complete(messages, text, languages):
+        return '{"French": "Bonjour"}', {"French": "Bonjour"}, "gpt-4o"
+
+    monkeypatch.setattr(main, "complete", complete)
+    monkeypatch.setattr(main, "translation_cache", LockedCache())
+    assert asyncio.run(main.request_translation("Hello", "French")) == "Bonjour"
@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+from datetime import datetime
+from xml.etree.ElementTree import ParseError, iterparse
+from xml.sax.saxutils import escape, quoteattr
+
+FIELDS = ["project", "language", "original_text", "translation", "date_added"]
+
+MEDIA_TYPES = {
+    "jsonl": "application/x-ndjson",
+    "csv": "text/csv",
+    "xliff": "application/x-xliff+xml",
+}
+
+XLIFF_NAMESPACE = "urn:oasis:names:tc:xliff:document:1.2"
+
+# Documents easily exceed the csv module's default 128 KB field limit
+csv.field_size_limit(2**31 - 1)
+
+
+def format_date(value):
+    return value.isoformat() if value is not None else None
+
+
+def parse_date(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps({**row, "date_added": format_date(row["date_added"])}, ensure_ascii=False) + "\n"
+
+
+def csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDS)
+    for row in rows:
+        writer.writerow([row[field] if field != "date_added" else format_date(row[field]) for field in FIELDS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def xliff_lines(rows, source_language):
+    """XLIFF 1.2 with one <file> per project and language, holding a single unit."""
+    yield f'<?xml version="1.0" encoding="UTF-8"?>\n<xliff version="1.2" xmlns="{XLIFF_NAMESPACE}">\n'
+    for row in rows:
+        date = f" date={quoteattr(format_date(row['date_added']))}" if row["date_added"] else ""
+        yield (
+            f'<file original={quoteattr(row["project"])} source-language={quoteattr(source_language)} '
+            f'target-language={quoteattr(row["language"])} datatype="html"{date}><body>'
+            f'<trans-unit id="1"><source>{escape(row["original_text"] or "")}</source>'
+            f'<target>{escape(row["translation"] or "")}</target></trans-unit></body></file>\n'
+        )
+    yield "</xliff>\n"
+
+
+def export_chunks(rows, format, source_language="en", chunk_size=65536):
+    """Serialize translation rows into ``format``, in chunks of about ``chunk_size`` characters."""
+    if format == "jsonl":
+        lines = jsonl_lines(rows)
+    elif format == "csv":
+        lines = csv_lines(rows)
+    else:
+        lines = xliff_lines(rows, source_language)
+    pending, size = [], 0
+    for line in lines:
+        pending.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield "".join(pending)
+            pending, size = [], 0
+    if pending:
+        yield "".join(pending)
+
+
+def local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def xliff_rows(file):
+    try:
+        for _, element in iterparse(file, events=("end",)):
+            if local_name(element.tag) != "file":
+                continue
+            for unit in element.iter():
+                if local_name(unit.tag) != "trans-unit":
+                    continue
+                texts = {local_name(child.tag): "".join(child.itertext()) for child in unit}
+                yield {
+                    "project": element.get("original"),
+                    "language": element.get("target-language"),
+                    "original_text": texts.get("source"),
+                    "translation": texts.get("target"),
+                    "date_added": element.get("date"),
+                }
+            # Drop the parsed file so memory stays flat
+            element.clear()
+    except ParseError as e:
+        raise ValueError(f"Invalid XLIFF: {str(e)}")
+
+
+def jsonl_rows(text):
+    for number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {number}: {str(e)}")
+        if not isinstance(row, dict):
+            raise ValueError(f"Line {number} is not a JSON object")
+        yield row
+
+
+def csv_rows(text):
+    try:
+        yield from csv.DictReader(text)
+    except csv.Error as e:
+        raise ValueError(f"Invalid CSV: {str(e)}")
+
+
+def read_rows(file, format):
+    """Yield translation rows from a binary file in ``format``.
+
+    Raises ValueError on content that cannot be parsed; rows read before
+    it have already been yielded.
+    """
+    if format == "xliff":
+        rows = xliff_rows(file)
+    else:
+        text = io.TextIOWrapper(file, encoding="utf-8", newline="")
+        if format == "csv":
+            rows = csv_rows(text)
+        else:
+            rows = jsonl_rows(text)
+    for row in rows:
+        try:
+            date_added = parse_date(row.get("date_added"))
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid date_added: {row.get('date_added')!r}")
+        yield {**row, "date_added": date_added}
@@ -1,99 +1,123 @@
 import streamlit as st
 import requests
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, MetaData, Table, inspect
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.sql import select
-from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from streamlit_quill import st_quill
+import json
 import os
+import sys
+# The translations storage is shared with the backend
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+from storage import TranslationStore
+from profiler import RerunProfiler, count_queries
 
-# SQLAlchemy setup
-DATABASE_URL = "sqlite:///translations.db"  # Example using SQLite
-engine = create_engine(DATABASE_URL)
-metadata = MetaData()
-
-# Define the translations table with an additional column for the original text
-translations_table = Table(
-    'translations', metadata,
-    Column('id', Integer, primary_key=True),
-    Column('project', String),
-    Column('language', String),
-    Column('original_text', String),  # New column for original text
-    Column('translation', String),
-    Column('date_added', DateTime)
-)
-
-# Create the table if it does not exist
-inspector = inspect(engine)
-if not inspector.has_table('translations'):
-    metadata.create_all(engine)
-
-Session = sessionmaker(bind=engine)
-session = Session()
-
-# Function to save translation to the database
-def save_translation(project, language, original_text, translation):
-    insert_stmt = translations_table.insert().values(
-        project=project,
-        language=language,
-        original_text=original_text,  # Save original text
-        translation=translation,
-        date_added=datetime.now()
-    )
-    session.execute(insert_stmt)
-    session.commit()
-
-# Function to update translation in the database
-def update_translation(project, language, original_text, translation):
-    update_stmt = translations_table.update().where(
-        (translations_table.c.project == project) & 
-        (translations_table.c.language == language)
-    ).values(
-        original_text=original_text,  # Update original text
-        translation=translation,
-        date_added=datetime.now()
-    )
-    session.execute(update_stmt)
-    session.commit()
-
-# Function to get saved translation from the database
-def get_saved_translation(project, language):
-    query = select(translations_table.c.original_text, translations_table.c.translation).where(
-        (translations_table.c.project == project) & 
-        (translations_table.c.language == language)
-    )
-    result = session.execute(query).fetchone()
-    return result if result else (None, None)
+# Rerun profiler: with TRANSLATION_APP_DEBUG set, the sidebar shows the time
+# and database queries each section of this script took on the last rerun
+DEBUG = os.getenv('TRANSLATION_APP_DEBUG', '').lower() in ('1', 'true', 'yes')
+profile = RerunProfiler()
+
+# Storage setup: SQLite locally, PostgreSQL for shared deployments
+DATABASE_URL = os.getenv('TRANSLATIONS_DATABASE_URL', 'sqlite:///translations.db')
 
-# Function to get all translations for a project
-def get_project_translations(project):
-    query = select(translations_table.c.language, translations_table.c.original_text, translations_table.c.translation).where(
-        translations_table.c.project == project
+# One store (engine and connection pool) per process, shared by all user sessions
+@st.cache_resource
+def get_store():
+    store = TranslationStore(
+        DATABASE_URL,
+        pool_size=int(os.getenv('TRANSLATIONS_DB_POOL_SIZE', '5')),
+        max_overflow=int(os.getenv('TRANSLATIONS_DB_MAX_OVERFLOW', '10')),
+        compress_min_bytes=int(os.getenv('TRANSLATIONS_COMPRESS_MIN_BYTES', '1024')),
     )
-    result = session.execute(query).fetchall()
-    return result
+    count_queries(store.engine)
+    return store
+
+store = get_store()
+
+# Read queries are cached per process, keyed by the store's write version so
+# a save from any session reloads what it changed on the next rerun. The TTL
+# bounds how long writes made elsewhere, like the backend's batch jobs, take
+# to show up.
+READ_CACHE_TTL = float(os.getenv('TRANSLATIONS_READ_CACHE_TTL', '60'))
+
+@st.cache_data(ttl=READ_CACHE_TTL, max_entries=1000, show_spinner=False)
+def load_project_translations(project, version):
+    """{language: (original_text, translation)} for every saved language of a project."""
+    return {
+        language: (original_text, translation)
+        for language, original_text, translation in store.get_project_translations(project)
+    }
+
+@st.cache_data(ttl=READ_CACHE_TTL, max_entries=1000, show_spinner=False)
+def load_saved_translation(project, language, version):
+    return store.get_saved_translation(project, language)
+
+@st.cache_data(ttl=READ_CACHE_TTL, max_entries=1000, show_spinner=False)
+def load_project_languages(project, version):
+    return store.get_project_languages(project)
+
+@st.cache_data(ttl=READ_CACHE_TTL, max_entries=1000, show_spinner=False)
+def load_project_original_text(project, version):
+    return store.get_project_original_text(project)
+
+@st.cache_data(ttl=READ_CACHE_TTL, max_entries=100, show_spinner=False)
+def load_project_count(search, version):
+    return store.count_projects(search)
+
+@st.cache_data(ttl=READ_CACHE_TTL, max_entries=100, show_spinner=False)
+def load_project_page(search, offset, limit, version):
+    return store.list_projects(search, offset=offset, limit=limit)
+
+# Concurrent translation requests per Translate click
+TRANSLATION_WORKERS = int(os.getenv('TRANSLATION_WORKERS', '25'))
+
+class TranslationFetchError(Exception):
+    pass
+
+# Pooled HTTP session shared by every rerun and worker thread
+@st.cache_resource
+def get_http_session():
+    http = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=TRANSLATION_WORKERS)
+    http.mount("http://", adapter)
+    http.mount("https://", adapter)
+    return http
 
 # Function to get translated text for a specific language from the URL
-def get_translated_text(input_html, language):
-    url = f"http://127.0.0.1:8000/translate/{language}/"
+def get_translated_text(input_html, language, on_partial=None):
+    """Stream the translation for a language, passing the partial text to on_partial.
+
+    Safe to call from worker threads: failures raise TranslationFetchError
+    instead of writing to the page.
+    """
+    url = f"http://127.0.0.1:8000/translate/{language}/stream"
     # fastapi_host = os.getenv('FASTAPI_HOST')
-    # url = f"http://{fastapi_host}:8000/translate/{language}/"
+    # url = f"http://{fastapi_host}:8000/translate/{language}/stream"
     payload = {"text": input_html}  # Send HTML content as "text"
-    response = requests.post(url, json=payload)
-    if response.status_code == 200:
-        try:
-            translation = response.json().get('translated_text')
-            if isinstance(translation, dict):
-                return translation.get(language)
-            return translation
-        except ValueError:
-            st.error("Error decoding JSON response")
-            st.text(response.text)  # Debug: Show the raw response text
-            return None
-    else:
-        st.error(f"Failed to fetch translation for {language}. Status code: {response.status_code}")
-        st.text(response.text)  # Debug: Show the raw response text
-        return None
+    with get_http_session().post(url, json=payload, stream=True) as response:
+        if response.status_code != 200:
+            raise TranslationFetchError(f"Failed to fetch translation for {language}. Status code: {response.status_code}\n{response.text}")
+
+        translation = ""
+        event = None
+        # Only "\n" ends an event line; splitlines() would also break on U+2028 and friends
+        for line in response.iter_lines(decode_unicode=True, delimiter="\n"):
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+                continue
+            if not line.startswith("data:"):
+                continue
+            try:
+                data = json.loads(line[len("data:"):])
+            except ValueError:
+                raise TranslationFetchError(f"Error decoding JSON response\n{line}")
+            if event in ("delta", "replace"):
+                translation = translation + data["text"] if event == "delta" else data["text"]
+                if on_partial is not None:
+                    on_partial(translation)
+            elif event == "error":
+                raise TranslationFetchError(f"Failed to fetch translation for {language}: {data.get('detail')}")
+            elif event == "done":
+                return translation
+    raise TranslationFetchError(f"Translation stream for {language} ended early.")
 
 # Function to check if a language is RTL
 def is_rtl_language(language):
@@ -105,6 +129,7 @@ st.title("Translation App")
 
 # Select page
 page = st.sidebar.selectbox("Select Page", ["Translate", "View Projects"])
+profile.mark("setup")
 
 if page == "Translate":
     # Initialize session state
@@ -137,35 +162,65 @@ if page == "Translate":
             st.session_state.modified_languages = {}  # Reset modified languages
             
             progress_bar = st.progress(0)
-            progress_step = 1 / len(languages)
-            current_progress = 0
-            
             status_text = st.empty()
-            
-            for idx, lang in enumerate(languages):
-                status_text.text(f"Translating in {lang}...")
-                translation = get_translated_text(input_html, lang)
-                if translation:
-                    st.session_state.translations[lang] = translation
-                    save_translation(project_name, lang, input_html, translation)
-                else:
-                    st.error(f"No translation received for {lang}.")
-                
-                current_progress += progress_step
-                progress_bar.progress(current_progress)
-            
+            preview = st.empty()
+
+            # Latest partial text per language, written by the worker threads
+            partials = {}
+
+            def translate_language(lang):
+                return get_translated_text(input_html, lang, lambda partial: partials.__setitem__(lang, partial))
+
+            completed = 0
+            with ThreadPoolExecutor(max_workers=TRANSLATION_WORKERS) as executor:
+                pending = {executor.submit(translate_language, lang): lang for lang in languages}
+                while pending:
+                    done, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                    # Handle languages in the order they finish
+                    for future in done:
+                        lang = pending.pop(future)
+                        try:
+                            translation = future.result()
+                        except (TranslationFetchError, requests.RequestException) as e:
+                            st.error(str(e))
+                            translation = None
+                        # An empty translation is still a successful one
+                        if translation is not None:
+                            st.session_state.translations[lang] = translation
+
+                        completed += 1
+                        progress_bar.progress(completed / len(languages))
+
+                    # Preview the first language, in list order, that is still streaming
+                    in_progress = [lang for lang in languages if lang in pending.values() and lang in partials]
+                    if in_progress:
+                        status_text.text(f"Translated {completed} of {len(languages)} languages, {in_progress[0]} so far:")
+                        preview.markdown(partials[in_progress[0]], unsafe_allow_html=True)
+
+            # Keep the sidebar in the usual language order
+            st.session_state.translations = {
+                lang: st.session_state.translations[lang] for lang in languages if lang in st.session_state.translations
+            }
+            store.save_translations(project_name, input_html, st.session_state.translations)
+            profile.mark("translate")
+            preview.empty()
             status_text.text("Translation complete.")
             progress_bar.progress(1.0)  # Ensure the progress bar reaches 100% after completion
         else:
             st.warning("Please enter both project name and text to translate.")
+    profile.mark("input")
 
     # Sidebar for language selection
     if st.session_state.translations:
         st.sidebar.title("Select Language")
         selected_language = st.sidebar.radio("Languages", list(st.session_state.translations.keys()))
 
-        # Check if the translation is already saved
-        original_text, saved_translation = get_saved_translation(project_name, selected_language)
+        # Check if the translation is already saved; the whole project is
+        # loaded at once so switching languages needs no query
+        original_text, saved_translation = load_project_translations(
+            project_name, store.write_version(project_name)
+        ).get(selected_language, (None, None))
+        profile.mark("load translation")
 
         # Display the translation for the selected language
         st.subheader(f"Translation in {selected_language}")
@@ -190,35 +245,61 @@ if page == "Translate":
 
         if st.button(f"Save Translation for {selected_language}"):
             if saved_translation:
-                update_translation(project_name, selected_language, original_text, translation_text)
+                store.save_translation(project_name, selected_language, original_text, translation_text)
                 st.success(f"Translation in {selected_language} updated successfully.")
             else:
-                save_translation(project_name, selected_language, input_html, translation_text)
+                store.save_translation(project_name, selected_language, input_html, translation_text)
                 st.success(f"Translation in {selected_language} saved successfully.")
             st.session_state.modified_languages[selected_language] = translation_text
+        profile.mark("show translation")
 
 elif page == "View Projects":
     st.header("View Project Translations")
 
-    # Retrieve list of projects
-    projects_query = select(translations_table.c.project).distinct()
-    projects = [row[0] for row in session.execute(projects_query).fetchall()]
+    # Search and page through the project summaries
+    PROJECTS_PER_PAGE = 50
+    search = st.text_input("Search projects")
+    project_count = load_project_count(search, store.write_version())
+    page_count = max((project_count + PROJECTS_PER_PAGE - 1) // PROJECTS_PER_PAGE, 1)
+    page_number = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+    st.caption(f"{project_count} projects, page {page_number} of {page_count}")
 
-    selected_project = st.selectbox("Select Project", projects)
+    summaries = {
+        project: (language_count, last_date_added)
+        for project, language_count, last_date_added in load_project_page(
+            search, (page_number - 1) * PROJECTS_PER_PAGE, PROJECTS_PER_PAGE, store.write_version()
+        )
+    }
+    profile.mark("list projects")
+
+    selected_project = st.selectbox(
+        "Select Project",
+        list(summaries),
+        format_func=lambda project: f"{project} ({summaries[project][0]} languages, updated {summaries[project][1]:%Y-%m-%d %H:%M})"
+        if summaries[project][1] else project,
+    )
 
     if selected_project:
-        translations = get_project_translations(selected_project)
-        if translations:
-            original_text = translations[0][1]  # Get the original text from the first translation entry
-            st.subheader("Language: English")
-            st_quill(value=original_text, key=f"{selected_project}_original", html=True, readonly=True)
-
-            for language, _, translation in translations:
-                st.subheader(f"Language: {language}")
-                if is_rtl_language(language):
-                    st.markdown(
-                        f'<div style="direction: rtl; text-align: right;">{translation}</div>',
-                        unsafe_allow_html=True
-                    )
-                else:
-                    st_quill(value=translation, key=f"{selected_project}_{language}_translation", html=True, readonly=True)
+        version = store.write_version(selected_project)
+        original_text = load_project_original_text(selected_project, version)
+        st.subheader("Language: English")
+        st_quill(value=original_text, key=f"{selected_project}_original", html=True, readonly=True)
+
+        # Translations are only loaded for the languages the user expands
+        for language in load_project_languages(selected_project, version):
+            if not st.checkbox(f"Language: {language}", key=f"{selected_project}_{language}_show"):
+                continue
+            _, translation = load_saved_translation(selected_project, language, version)
+            if is_rtl_language(language):
+                st.markdown(
+                    f'<div style="direction: rtl; text-align: right;">{translation}</div>',
+                    unsafe_allow_html=True
+                )
+            else:
+                st_quill(value=translation, key=f"{selected_project}_{language}_translation", html=True, readonly=True)
+        profile.mark("show project")
+
+if DEBUG:
+    profile.mark("rest")
+    with st.sidebar.expander("Rerun profile", expanded=True):
+        st.table(profile.rows())
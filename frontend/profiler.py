@@ -0,0 +1,53 @@
+import threading
+import time
+
+from sqlalchemy import event
+
+# Queries issued by the current thread; Streamlit runs each script rerun in
+# its session's own thread
+_queries = threading.local()
+
+
+def count_queries(engine):
+    """Count every statement ``engine`` executes, per thread."""
+    def before_cursor_execute(*args):
+        _queries.count = getattr(_queries, 'count', 0) + 1
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def query_count():
+    return getattr(_queries, 'count', 0)
+
+
+class RerunProfiler:
+    """Wall-clock time and database queries per section of one script run.
+
+    Sections are delimited by calls to ``mark``, so the script is timed
+    without restructuring it: each mark closes the section that began at
+    the previous one.
+    """
+
+    def __init__(self):
+        self.started = self.last = time.perf_counter()
+        self.started_queries = self.last_queries = query_count()
+        self.sections = {}
+
+    def mark(self, name):
+        """Attribute the time and queries since the previous mark to ``name``."""
+        now, queries = time.perf_counter(), query_count()
+        seconds, count = self.sections.get(name, (0.0, 0))
+        self.sections[name] = (seconds + now - self.last, count + queries - self.last_queries)
+        self.last, self.last_queries = now, queries
+
+    def total(self):
+        return time.perf_counter() - self.started, query_count() - self.started_queries
+
+    def rows(self):
+        """One row per section in script order, then the whole run."""
+        rows = [
+            {"section": name, "ms": round(seconds * 1000, 1), "queries": queries}
+            for name, (seconds, queries) in self.sections.items()
+        ]
+        seconds, queries = self.total()
+        rows.append({"section": "total", "ms": round(seconds * 1000, 1), "queries": queries})
+        return rows
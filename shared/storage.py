@@ -0,0 +1,487 @@
+"""Storage of saved translations, shared by the Streamlit app and the backend."""
+import hashlib
+import threading
+import zlib
+from datetime import datetime
+
+from sqlalchemy import (
+    Column, DateTime, Index, Integer, LargeBinary, MetaData, String, Table, bindparam, create_engine, delete, event,
+    exists, func, inspect, select, text, tuple_,
+)
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DatabaseError
+from sqlalchemy.orm import sessionmaker
+
+metadata = MetaData()
+
+# Define the translations table with an additional column for the original text
+translations_table = Table(
+    'translations', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('project', String),
+    Column('language', String),
+    Column('original_text', String),  # Only on rows not yet moved to source_texts
+    Column('source_hash', String(64)),
+    Column('translation', String),
+    Column('date_added', DateTime),
+    # One translation per project and language; also serves every lookup
+    Index('ix_translations_project_language', 'project', 'language', unique=True),
+    Index('ix_translations_source_hash', 'source_hash')
+)
+
+# Each original text is stored once, addressed by the SHA-256 of its content,
+# and shared by every translation made from it
+source_texts_table = Table(
+    'source_texts', metadata,
+    Column('hash', String(64), primary_key=True),
+    Column('encoding', String(16), nullable=False),  # 'plain' or 'zlib'
+    Column('body', LargeBinary, nullable=False)
+)
+
+# One row per project, kept up to date by every write so listing projects
+# never has to scan the translations table
+project_summaries_table = Table(
+    'project_summaries', metadata,
+    Column('project', String, primary_key=True),
+    Column('language_count', Integer, nullable=False),
+    Column('last_date_added', DateTime),
+    Index('ix_project_summaries_last_date_added', 'last_date_added')
+)
+
+
+def source_hash(original_text):
+    return hashlib.sha256(original_text.encode('utf-8')).hexdigest()
+
+
+def encode_source(original_text, compress_min_bytes):
+    """Body and encoding to store; large texts are compressed when that makes them smaller."""
+    body = original_text.encode('utf-8')
+    if compress_min_bytes is not None and len(body) >= compress_min_bytes:
+        compressed = zlib.compress(body)
+        if len(compressed) < len(body):
+            return 'zlib', compressed
+    return 'plain', body
+
+
+def decode_source(encoding, body):
+    if encoding == 'zlib':
+        body = zlib.decompress(body)
+    return body.decode('utf-8')
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers proceed while a translation job is being written and
+    # makes each commit a single append to the log
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+class TranslationStore:
+    """Translations storage selected by database URL.
+
+    SQLite suits a single local user; PostgreSQL (``postgresql+psycopg2://...``)
+    is meant for shared deployments and gets a sized connection pool. Every
+    method opens its own short-lived session, so concurrent Streamlit sessions
+    never share one. Original texts are stored once in source_texts, and those
+    of ``compress_min_bytes`` or more are zlib-compressed. Every write bumps
+    ``write_version`` so callers caching reads can tell when to reload.
+    """
+
+    def __init__(self, database_url, pool_size=5, max_overflow=10, pool_timeout=30, pool_recycle=1800,
+                 compress_min_bytes=1024):
+        self.compress_min_bytes = compress_min_bytes
+        url = make_url(database_url)
+        if url.get_backend_name() == 'sqlite':
+            self.engine = create_engine(url)
+            event.listen(self.engine, "connect", set_sqlite_pragmas)
+        else:
+            self.engine = create_engine(
+                url,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_timeout=pool_timeout,
+                pool_recycle=pool_recycle,
+                pool_pre_ping=True,
+            )
+        self.Session = sessionmaker(bind=self.engine)
+        self._versions = {}
+        self._versions_lock = threading.Lock()
+        # Backend worker processes starting together race to create each
+        # table; the loser of each race retries with whatever the others created
+        for attempt in range(5):
+            try:
+                self.migrate()
+                break
+            except DatabaseError:
+                if attempt == 4:
+                    raise
+
+    def write_version(self, project=None):
+        """Number of writes made through this store, to ``project`` or to any project."""
+        return self._versions.get(project, 0)
+
+    def record_write(self, project):
+        with self._versions_lock:
+            for key in (project, None):
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def migrate(self):
+        """Create the schema, or bring an existing database up to date."""
+        inspector = inspect(self.engine)
+        if not inspector.has_table('translations'):
+            metadata.create_all(self.engine)
+            return
+        metadata.create_all(self.engine, tables=[project_summaries_table, source_texts_table])
+
+        column_names = {column['name'] for column in inspector.get_columns('translations')}
+        if 'source_hash' not in column_names:
+            with self.engine.begin() as connection:
+                connection.execute(text("ALTER TABLE translations ADD COLUMN source_hash VARCHAR(64)"))
+
+        index_names = {index['name'] for index in inspector.get_indexes('translations')}
+        if 'ix_translations_project_language' not in index_names:
+            with self.engine.begin() as connection:
+                # Older databases kept every save as a new row; keep the latest one
+                connection.execute(text(
+                    "DELETE FROM translations WHERE id NOT IN "
+                    "(SELECT MAX(id) FROM translations GROUP BY project, language)"
+                ))
+        with self.engine.begin() as connection:
+            for index in translations_table.indexes:
+                if index.name not in index_names:
+                    index.create(connection)
+
+        if self.move_source_texts() and self.engine.dialect.name == 'sqlite':
+            # Give the space freed by the inline copies back to the filesystem
+            with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+                connection.execute(text("VACUUM"))
+
+        with self.engine.begin() as connection:
+            # Summarize projects written before summaries existed
+            connection.execute(project_summaries_table.insert().from_select(
+                ['project', 'language_count', 'last_date_added'],
+                select(
+                    translations_table.c.project,
+                    func.count(),
+                    func.max(translations_table.c.date_added),
+                ).where(
+                    translations_table.c.project.not_in(select(project_summaries_table.c.project))
+                ).group_by(translations_table.c.project)
+            ))
+
+    def move_source_texts(self, batch_size=500):
+        """Replace original texts stored on each translation row with references to source_texts.
+
+        Returns the number of rows moved.
+        """
+        moved = 0
+        while True:
+            with self.engine.begin() as connection:
+                rows = connection.execute(
+                    select(translations_table.c.id, translations_table.c.original_text).where(
+                        translations_table.c.source_hash.is_(None),
+                        translations_table.c.original_text.is_not(None),
+                    ).limit(batch_size)
+                ).fetchall()
+                if not rows:
+                    return moved
+                hashes = self.store_source_texts(connection, {row.original_text for row in rows})
+                connection.execute(
+                    translations_table.update().where(translations_table.c.id == bindparam('row_id')).values(
+                        source_hash=bindparam('row_source_hash'),
+                        original_text=None,
+                    ),
+                    [{'row_id': row.id, 'row_source_hash': hashes[row.original_text]} for row in rows]
+                )
+            moved += len(rows)
+
+    def store_source_texts(self, connection, original_texts):
+        """Store each text unless already present; returns the hash of each."""
+        hashes = {original_text: source_hash(original_text) for original_text in original_texts}
+        existing = set(connection.execute(
+            select(source_texts_table.c.hash).where(source_texts_table.c.hash.in_(list(hashes.values())))
+        ).scalars())
+        rows = []
+        for original_text, digest in hashes.items():
+            if digest not in existing:
+                encoding, body = encode_source(original_text, self.compress_min_bytes)
+                rows.append({'hash': digest, 'encoding': encoding, 'body': body})
+        if rows:
+            dialect = self.engine.dialect.name
+            if dialect in ('sqlite', 'postgresql'):
+                # Another writer may store the same text meanwhile
+                insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+                connection.execute(insert(source_texts_table).on_conflict_do_nothing(index_elements=['hash']), rows)
+            else:
+                connection.execute(source_texts_table.insert(), rows)
+        return hashes
+
+    def delete_unused_source_texts(self, connection, hashes):
+        if not hashes:
+            return
+        connection.execute(delete(source_texts_table).where(
+            source_texts_table.c.hash.in_(list(hashes)),
+            ~exists().where(translations_table.c.source_hash == source_texts_table.c.hash)
+        ))
+
+    def load_source_texts(self, connection, hashes):
+        hashes = [digest for digest in set(hashes) if digest is not None]
+        if not hashes:
+            return {}
+        rows = connection.execute(
+            select(source_texts_table.c.hash, source_texts_table.c.encoding, source_texts_table.c.body).where(
+                source_texts_table.c.hash.in_(hashes)
+            )
+        ).fetchall()
+        return {row.hash: decode_source(row.encoding, row.body) for row in rows}
+
+    def refresh_project_summary(self, session, project):
+        """Recompute one project's summary row; cheap thanks to the (project, language) index."""
+        language_count, last_date_added = session.execute(
+            select(func.count(), func.max(translations_table.c.date_added)).where(
+                translations_table.c.project == project
+            )
+        ).one()
+        if not language_count:
+            session.execute(delete(project_summaries_table).where(project_summaries_table.c.project == project))
+            return
+        summary = {'project': project, 'language_count': language_count, 'last_date_added': last_date_added}
+        dialect = self.engine.dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            # An upsert, so concurrent saves to one project cannot both insert its row
+            insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+            insert_stmt = insert(project_summaries_table).values(summary)
+            session.execute(insert_stmt.on_conflict_do_update(
+                index_elements=['project'],
+                set_={
+                    'language_count': insert_stmt.excluded.language_count,
+                    'last_date_added': insert_stmt.excluded.last_date_added,
+                }
+            ))
+        else:
+            session.execute(delete(project_summaries_table).where(project_summaries_table.c.project == project))
+            session.execute(project_summaries_table.insert().values(summary))
+
+    def upsert_statement(self, rows):
+        dialect = self.engine.dialect.name
+        if dialect not in ('sqlite', 'postgresql'):
+            return None
+        insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+        insert_stmt = insert(translations_table).values(rows)
+        return insert_stmt.on_conflict_do_update(
+            index_elements=['project', 'language'],
+            set_={
+                'original_text': insert_stmt.excluded.original_text,
+                'source_hash': insert_stmt.excluded.source_hash,
+                'translation': insert_stmt.excluded.translation,
+                'date_added': insert_stmt.excluded.date_added,
+            }
+        )
+
+    def save_translations(self, project, original_text, translations):
+        """Insert or replace all translations of one translation job in a single transaction."""
+        if not translations:
+            return
+        now = datetime.now()
+        with self.Session.begin() as session:
+            previous_hashes = set(session.execute(
+                select(translations_table.c.source_hash).where(translations_table.c.project == project).distinct()
+            ).scalars())
+            digest = None
+            if original_text is not None:
+                digest = self.store_source_texts(session, {original_text})[original_text]
+            rows = [
+                {
+                    'project': project,
+                    'language': language,
+                    'original_text': None,
+                    'source_hash': digest,
+                    'translation': translation,
+                    'date_added': now,
+                }
+                for language, translation in translations.items()
+            ]
+            upsert_stmt = self.upsert_statement(rows)
+            if upsert_stmt is not None:
+                session.execute(upsert_stmt)
+            else:
+                session.execute(delete(translations_table).where(
+                    tuple_(translations_table.c.project, translations_table.c.language).in_(
+                        [(project, language) for language in translations]
+                    )
+                ))
+                session.execute(translations_table.insert(), rows)
+            self.delete_unused_source_texts(session, previous_hashes - {digest, None})
+            self.refresh_project_summary(session, project)
+        self.record_write(project)
+
+    def save_rows(self, rows, statement_size=500):
+        """Insert or replace translations of any projects in a single transaction.
+
+        ``rows`` are dicts with project, language, original_text and translation,
+        and optionally the date_added to keep. Used by the backend's batch
+        jobs and bulk import.
+        """
+        if not rows:
+            return
+        now = datetime.now()
+        # Later rows win when a batch holds the same (project, language) twice
+        rows = list({(row['project'], row['language']): row for row in rows}.values())
+        projects = {row['project'] for row in rows}
+        key_filter = tuple_(translations_table.c.project, translations_table.c.language).in_(
+            [(row['project'], row['language']) for row in rows]
+        )
+        with self.Session.begin() as session:
+            previous_hashes = set(session.execute(
+                select(translations_table.c.source_hash).where(key_filter).distinct()
+            ).scalars())
+            hashes = self.store_source_texts(session, {row['original_text'] for row in rows})
+            values = [
+                {
+                    'project': row['project'],
+                    'language': row['language'],
+                    'original_text': None,
+                    'source_hash': hashes[row['original_text']],
+                    'translation': row['translation'],
+                    'date_added': row.get('date_added') or now,
+                }
+                for row in rows
+            ]
+            if self.upsert_statement(values[:1]) is not None:
+                # Several statements keep each under SQLite's bound parameter limit
+                for start in range(0, len(values), statement_size):
+                    session.execute(self.upsert_statement(values[start:start + statement_size]))
+            else:
+                session.execute(delete(translations_table).where(key_filter))
+                session.execute(translations_table.insert(), values)
+            self.delete_unused_source_texts(session, previous_hashes - set(hashes.values()) - {None})
+            for project in projects:
+                self.refresh_project_summary(session, project)
+        for project in projects:
+            self.record_write(project)
+
+    def save_translation(self, project, language, original_text, translation):
+        self.save_translations(project, original_text, {language: translation})
+
+    def get_saved_translation(self, project, language):
+        query = select(
+            translations_table.c.original_text, translations_table.c.source_hash, translations_table.c.translation
+        ).where(
+            (translations_table.c.project == project) &
+            (translations_table.c.language == language)
+        )
+        with self.Session() as session:
+            result = session.execute(query).fetchone()
+            if not result:
+                return None, None
+            sources = self.load_source_texts(session, [result.source_hash])
+        return sources.get(result.source_hash, result.original_text), result.translation
+
+    def get_project_translations(self, project):
+        """(language, original_text, translation) for every language; each source is decoded once."""
+        query = select(
+            translations_table.c.language,
+            translations_table.c.original_text,
+            translations_table.c.source_hash,
+            translations_table.c.translation,
+        ).where(
+            translations_table.c.project == project
+        )
+        with self.Session() as session:
+            rows = session.execute(query).fetchall()
+            sources = self.load_source_texts(session, [row.source_hash for row in rows])
+        return [
+            (row.language, sources.get(row.source_hash, row.original_text), row.translation)
+            for row in rows
+        ]
+
+    def get_project_languages(self, project):
+        query = select(translations_table.c.language).where(
+            translations_table.c.project == project
+        ).order_by(translations_table.c.language)
+        with self.Session() as session:
+            return [row[0] for row in session.execute(query).fetchall()]
+
+    def get_project_original_text(self, project):
+        query = select(translations_table.c.original_text, translations_table.c.source_hash).where(
+            translations_table.c.project == project
+        ).limit(1)
+        with self.Session() as session:
+            result = session.execute(query).fetchone()
+            if not result:
+                return None
+            sources = self.load_source_texts(session, [result.source_hash])
+        return sources.get(result.source_hash, result.original_text)
+
+    def project_filter(self, search):
+        if not search:
+            return True
+        return project_summaries_table.c.project.contains(search, autoescape=True)
+
+    def count_projects(self, search=None):
+        query = select(func.count()).select_from(project_summaries_table).where(self.project_filter(search))
+        with self.Session() as session:
+            return session.execute(query).scalar()
+
+    def list_projects(self, search=None, offset=0, limit=50):
+        """One page of project summaries, most recently updated first."""
+        query = select(
+            project_summaries_table.c.project,
+            project_summaries_table.c.language_count,
+            project_summaries_table.c.last_date_added,
+        ).where(self.project_filter(search)).order_by(
+            project_summaries_table.c.last_date_added.desc(),
+            project_summaries_table.c.project,
+        ).offset(offset).limit(limit)
+        with self.Session() as session:
+            return session.execute(query).fetchall()
+
+    def iter_translations(self, project=None, language=None, since=None, until=None, batch_size=1000):
+        """Yield stored translations as dicts, ordered by project and language.
+
+        Rows come through a server-side cursor ``batch_size`` at a time, so
+        memory stays flat however many match. ``since`` is inclusive and
+        ``until`` exclusive, both on date_added.
+        """
+        query = select(
+            translations_table.c.project,
+            translations_table.c.language,
+            translations_table.c.original_text,
+            translations_table.c.source_hash,
+            translations_table.c.translation,
+            translations_table.c.date_added,
+            source_texts_table.c.encoding,
+            source_texts_table.c.body,
+        ).select_from(
+            translations_table.outerjoin(source_texts_table, source_texts_table.c.hash == translations_table.c.source_hash)
+        ).order_by(translations_table.c.project, translations_table.c.language)
+        if project is not None:
+            query = query.where(translations_table.c.project == project)
+        if language is not None:
+            query = query.where(translations_table.c.language == language)
+        if since is not None:
+            query = query.where(translations_table.c.date_added >= since)
+        if until is not None:
+            query = query.where(translations_table.c.date_added < until)
+
+        with self.engine.connect() as connection:
+            result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+            # Rows of one project share their source, so decode it once
+            decoded_hash, decoded_text = None, None
+            for row in result:
+                if row.body is not None and row.source_hash != decoded_hash:
+                    decoded_hash, decoded_text = row.source_hash, decode_source(row.encoding, row.body)
+                yield {
+                    'project': row.project,
+                    'language': row.language,
+                    'original_text': decoded_text if row.body is not None else row.original_text,
+                    'translation': row.translation,
+                    'date_added': row.date_added,
+                }
+
+    def close(self):
+        self.engine.dispose()